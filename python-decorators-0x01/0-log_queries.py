@@ -1,19 +1,20 @@
 import sqlite3
 import functools
-from datetime import datetime
 
-#### decorator to lof SQL queries
+from instrumentation import instrument_queries
 
- def log_queries(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Attempt to extract the SQL query
-        query = kwargs.get('query') if 'query' in kwargs else args[0] if args else "UNKNOWN QUERY"
+#### decorator to log SQL queries
+#
+# Each call is timed and logged as a structured event (query, duration, row
+# count, redacted params, caller) through a queue, so the caller never waits
+# on I/O. `sample_rate` logs only a fraction of calls; calls slower than
+# `slow_ms` are always logged. Events are JSON lines on stderr unless
+# instrumentation.configure_query_logging() routes them elsewhere.
 
-        # Log the query with the current timestamp
-        print(f"[{datetime.now()}] Executing SQL Query: {query}")
-        return func(*args, **kwargs)
-    return wrapper
+def log_queries(func=None, *, sample_rate=1.0, slow_ms=100.0):
+    if func is None:
+        return functools.partial(log_queries, sample_rate=sample_rate, slow_ms=slow_ms)
+    return instrument_queries(func, sample_rate=sample_rate, slow_ms=slow_ms)
 
 @log_queries
 def fetch_all_users(query):
@@ -24,5 +25,6 @@ def fetch_all_users(query):
     conn.close()
     return results
 
-#### fetch users while logging the query
-users = fetch_all_users(query="SELECT * FROM users")
+if __name__ == "__main__":
+    #### fetch users while logging the query
+    users = fetch_all_users(query="SELECT * FROM users")
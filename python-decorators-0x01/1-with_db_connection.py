@@ -1,11 +1,39 @@
 import sqlite3
 import functools
+import inspect
+
+from connection_pool import DB_PATH, get_async_pool, get_pool, open_async_connection
 
 # Decorator to automatically manage DB connection
-def with_db_connection(func):
+#
+# @with_db_connection opens and closes users.db around every call.
+# @with_db_connection(pooled=True) leases an already-open connection instead
+# (mode="pool" for a bounded shared pool, "thread" for one per thread), keeping
+# its prepared-statement cache and PRAGMAs across calls; see connection_pool.py.
+# Coroutine functions get an aiosqlite connection instead (pooled per event loop).
+def with_db_connection(func=None, *, pooled=False, mode="pool", db_path=DB_PATH, **pool_options):
+    if func is None:
+        return functools.partial(with_db_connection, pooled=pooled, mode=mode, db_path=db_path, **pool_options)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if pooled:
+                async with get_async_pool(db_path, **pool_options).lease() as conn:
+                    return await func(conn, *args, **kwargs)
+            conn = await open_async_connection(db_path, pragmas={})
+            try:
+                return await func(conn, *args, **kwargs)
+            finally:
+                await conn.close()
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')
+        if pooled:
+            with get_pool(db_path, mode, **pool_options).lease() as conn:
+                return func(conn, *args, **kwargs)
+        conn = sqlite3.connect(db_path)
         try:
             # Pass the connection as the first argument
             result = func(conn, *args, **kwargs)
@@ -20,6 +48,7 @@ def get_user_by_id(conn, user_id):
     cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
     return cursor.fetchone()
 
-# Fetch user by ID with automatic connection handling
-user = get_user_by_id(user_id=1)
-print(user)
+if __name__ == "__main__":
+    # Fetch user by ID with automatic connection handling
+    user = get_user_by_id(user_id=1)
+    print(user)
@@ -1,5 +1,8 @@
 import sqlite3
 import functools
+import inspect
+
+from transactions import atransaction, transaction
 
 # Decorator to automatically manage DB connection
 def with_db_connection(func):
@@ -9,4 +12,45 @@ def with_db_connection(func):
         try:
             result = func(conn, *args, **kwargs)
         finally:
-            conn.
+            conn.close()
+        return result
+    return wrapper
+
+# Decorator to run the function in one transaction
+#
+# Commits when the function returns and rolls back when it raises. Called
+# while the connection is already in a transaction (e.g. one transactional
+# function calling another), it uses a savepoint, so only the inner
+# function's writes are undone on failure. That includes the implicit
+# transaction sqlite3 opens before an INSERT/UPDATE/DELETE on a connection
+# with the default isolation_level: if the caller wrote before calling, the
+# function's writes are NOT committed here and the caller must commit (or
+# use an isolation_level=None connection). `immediate=True` takes the write
+# lock up front with BEGIN IMMEDIATE. Coroutine functions (aiosqlite
+# connections) are supported. See transactions.py.
+def transactional(func=None, *, immediate=False):
+    if func is None:
+        return functools.partial(transactional, immediate=immediate)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(conn, *args, **kwargs):
+            async with atransaction(conn, immediate):
+                return await func(conn, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        with transaction(conn, immediate):
+            return func(conn, *args, **kwargs)
+    return wrapper
+
+@with_db_connection
+@transactional
+def update_user_email(conn, user_id, new_email):
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+if __name__ == "__main__":
+    #### Update user's email with automatic transaction handling
+    update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
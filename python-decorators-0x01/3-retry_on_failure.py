@@ -1,7 +1,8 @@
-import time
 import sqlite3
 import functools
 
+from resilience import is_retryable, retry
+
 # Decorator to automatically manage DB connection
 def with_db_connection(func):
     @functools.wraps(func)
@@ -15,31 +16,26 @@ def with_db_connection(func):
     return wrapper
 
 # Decorator to retry function on failure
-def retry_on_failure(retries=3, delay=2):
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            last_exception = None
-            for attempt in range(1, retries + 1):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    print(f"Attempt {attempt} failed with error: {e}")
-                    last_exception = e
-                    if attempt < retries:
-                        time.sleep(delay)
-            print("All retry attempts failed.")
-            raise last_exception
-        return wrapper
-    return decorator
+#
+# Up to `retries` attempts. After failed attempt n it waits a random time up
+# to `delay * 2**(n - 1)` (capped at `max_delay`). Only errors `retry_on`
+# classifies as transient are retried (by default "database is locked" and
+# similar). `max_elapsed` bounds the total time spent. With `breaker` (a
+# resource name such as the database path) repeated failures open a circuit
+# breaker shared by every function using that name, and calls then fail fast
+# with CircuitOpenError. See resilience.py.
+def retry_on_failure(retries=3, delay=2, max_delay=30.0, max_elapsed=None, retry_on=is_retryable, breaker=None):
+    return retry(retries=retries, base_delay=delay, max_delay=max_delay,
+                 max_elapsed=max_elapsed, retry_on=retry_on, breaker=breaker)
 
 @with_db_connection
-@retry_on_failure(retries=3, delay=1)
+@retry_on_failure(retries=3, delay=1, breaker='users.db')
 def fetch_users_with_retry(conn):
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users")
     return cursor.fetchall()
 
-# Attempt to fetch users with automatic retry on failure
-users = fetch_users_with_retry()
-print(users)
+if __name__ == "__main__":
+    # Attempt to fetch users with automatic retry on failure
+    users = fetch_users_with_retry()
+    print(users)
@@ -1,9 +1,20 @@
 import time
+import asyncio
+import logging
 import sqlite3
 import functools
+import inspect
+import threading
 
-# Global cache dictionary
-query_cache = {}
+from connection_pool import get_async_pool, get_pool
+from query_cache import QueryCache, SingleFlight, adatabase_path, database_path, is_write, tables_in
+
+# Global cache: bounded LRU with optional TTL (see query_cache.py)
+query_cache = QueryCache(max_entries=1024)
+
+_MISSING = object()
+
+log = logging.getLogger(__name__)
 
 # Decorator to automatically manage DB connection
 def with_db_connection(func):
@@ -18,17 +29,159 @@ def with_db_connection(func):
     return wrapper
 
 # Decorator to cache query results
-def cache_query(func):
+#
+# Results are keyed by database file, SQL text and bind parameters (`params`
+# keyword or second positional argument). A write statement is never cached;
+# it runs and then invalidates every cached result of the tables it touches.
+#
+# Concurrent misses for the same key are coalesced: one caller runs the query
+# and the others wait for its result (single-flight). With
+# `stale_while_revalidate=N` an entry older than `ttl` is still served for up
+# to N more seconds. The first caller to see it stale starts a refresh in the
+# background, on a pooled connection. Coroutine functions (aiosqlite
+# connections) get the same behaviour without blocking the event loop.
+# `pool_options` configure that pool (see connection_pool.get_pool); by
+# default it applies no PRAGMAs, so a refresh never switches the database
+# to WAL. A pool already opened for the file is reused as it is.
+#
+# `cache` is anything following query_cache.CacheBackend: a QueryCache, a
+# DiskCache shared by all worker processes (disk_cache.py) or both stacked in
+# a TieredCache. Table versions are stamped before the query runs, so a
+# result whose tables were written meanwhile is not cached.
+def cache_query(func=None, *, cache=None, ttl=None, db_path=None, stale_while_revalidate=None, pool_options=None):
+    if func is None:
+        return functools.partial(cache_query, cache=cache, ttl=ttl, db_path=db_path,
+                                 stale_while_revalidate=stale_while_revalidate, pool_options=pool_options)
+
+    pool_options = {"pragmas": {}} if pool_options is None else pool_options
+    if inspect.iscoroutinefunction(func):
+        return _async_cache_query(func, cache, ttl, db_path, stale_while_revalidate, pool_options)
+
+    flights = SingleFlight()
+
+    def refresh_in_background(store, key, db, args, kwargs):
+        def load():
+            stamp = store.stamp(key)
+            with get_pool(db, **pool_options).lease() as conn:
+                result = func(conn, *args, **kwargs)
+            store.set(key, result, ttl=ttl, stale_for=stale_while_revalidate, stamp=stamp)
+            return result
+
+        def run():
+            try:
+                flights.do(key, load)
+            except Exception:
+                log.warning("background refresh of %r failed; serving the stale result", key[1], exc_info=True)
+
+        threading.Thread(target=run, name="cache-refresh", daemon=True).start()
+
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
+        store = query_cache if cache is None else cache
         query = kwargs.get('query') if 'query' in kwargs else args[0] if args else None
-        if query in query_cache:
-            print("Returning cached result.")
-            return query_cache[query]
-        print("Query not cached. Executing and caching result.")
-        result = func(conn, *args, **kwargs)
-        query_cache[query] = result
-        return result
+        params = kwargs.get('params') if 'params' in kwargs else args[1] if len(args) > 1 else None
+        if query is None:
+            return func(conn, *args, **kwargs)
+        db = db_path or database_path(conn)
+        if is_write(query):
+            result = func(conn, *args, **kwargs)
+            store.invalidate_tables(db, tables_in(query))
+            return result
+        key = store.key(db, query, params)
+        # an in-memory database ("") cannot be reopened for a background refresh
+        found = store.lookup(key, allow_stale=stale_while_revalidate is not None and bool(db))
+        if found is not None:
+            value, fresh = found
+            if not fresh and not flights.in_flight(key):
+                refresh_in_background(store, key, db, args, kwargs)
+            return value
+
+        def load():
+            stamp = store.stamp(key)
+            result = func(conn, *args, **kwargs)
+            store.set(key, result, ttl=ttl, stale_for=stale_while_revalidate, stamp=stamp)
+            return result
+        return flights.do(key, load)
+    wrapper.flights = flights
+    return wrapper
+
+def _async_cache_query(func, cache, ttl, db_path, stale_while_revalidate, pool_options):
+    in_flight = {}  # (event loop, cache key) -> future of the one running query
+    background = set()  # keeps refresh tasks referenced until they finish
+
+    def claim(flight):
+        """Register the caller as leader; synchronous, so no other task can claim in between."""
+        future = in_flight[flight] = asyncio.get_running_loop().create_future()
+        return future
+
+    def release(flight, future):
+        if not future.done():
+            future.cancel()  # a refresh task cancelled before it started running
+        if in_flight.get(flight) is future:
+            del in_flight[flight]
+
+    async def lead(flight, future, store, key, run):
+        try:
+            stamp = store.stamp(key)
+            result = await run()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        else:
+            store.set(key, result, ttl=ttl, stale_for=stale_while_revalidate, stamp=stamp)
+            future.set_result(result)
+            return result
+        finally:
+            release(flight, future)
+
+    async def refresh(flight, future, store, key, db, args, kwargs):
+        async def run():
+            async with get_async_pool(db, **pool_options).lease() as conn:
+                return await func(conn, *args, **kwargs)
+        try:
+            await lead(flight, future, store, key, run)
+        except Exception:
+            log.warning("background refresh of %r failed; serving the stale result", key[1], exc_info=True)
+
+    @functools.wraps(func)
+    async def wrapper(conn, *args, **kwargs):
+        store = query_cache if cache is None else cache
+        query = kwargs.get('query') if 'query' in kwargs else args[0] if args else None
+        params = kwargs.get('params') if 'params' in kwargs else args[1] if len(args) > 1 else None
+        if query is None:
+            return await func(conn, *args, **kwargs)
+        db = db_path or await adatabase_path(conn)
+        if is_write(query):
+            result = await func(conn, *args, **kwargs)
+            store.invalidate_tables(db, tables_in(query))
+            return result
+        key = store.key(db, query, params)
+        flight = (asyncio.get_running_loop(), key)
+        while True:
+            found = store.lookup(key, allow_stale=stale_while_revalidate is not None and bool(db))
+            if found is not None:
+                value, fresh = found
+                if not fresh and flight not in in_flight:
+                    future = claim(flight)
+                    task = asyncio.create_task(refresh(flight, future, store, key, db, args, kwargs))
+                    background.add(task)
+                    task.add_done_callback(background.discard)
+                    task.add_done_callback(lambda _: release(flight, future))
+                return value
+            leader = in_flight.get(flight)
+            if leader is None:
+                break
+            try:
+                return await asyncio.shield(leader)
+            except asyncio.CancelledError:
+                if not leader.cancelled():
+                    raise  # we were cancelled ourselves
+                # the leading caller was cancelled: try again, possibly as the new leader
+        return await lead(flight, claim(flight), store, key, lambda: func(conn, *args, **kwargs))
     return wrapper
 
 @with_db_connection
@@ -38,11 +191,13 @@ def fetch_users_with_cache(conn, query):
     cursor.execute(query)
     return cursor.fetchall()
 
-# First call will cache the result
-users = fetch_users_with_cache(query="SELECT * FROM users")
+if __name__ == "__main__":
+    # First call will cache the result
+    users = fetch_users_with_cache(query="SELECT * FROM users")
 
-# Second call will use the cached result
-users_again = fetch_users_with_cache(query="SELECT * FROM users")
+    # Second call will use the cached result
+    users_again = fetch_users_with_cache(query="SELECT * FROM users")
 
-print(users)
-print(users_again)
+    print(users)
+    print(users_again)
+    print(query_cache.stats())
@@ -0,0 +1,99 @@
+"""Per-call latency of with_db_connection: connect-per-call vs pooled modes.
+
+Usage:
+    python bench_connection.py --calls 20000
+    python bench_connection.py --db users.db --threads 4
+
+Every variant runs the same primary-key lookup through a decorated function.
+Without `--db` a temporary database with a `users` table is created.
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+from connection_pool import close_pools
+
+decorators = __import__('1-with_db_connection')
+
+
+def _make_db(path: str, rows: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+    conn.executemany(
+        "INSERT OR IGNORE INTO users (id, name, email) VALUES (?, ?, ?)",
+        ((i, f"user{i}", f"user{i}@example.com") for i in range(1, rows + 1)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _lookup(conn, user_id):
+    return conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+
+
+def variants(db: str, cached_statements: int) -> Dict[str, Callable]:
+    wrap = decorators.with_db_connection
+    return {
+        "connect_per_call": wrap(db_path=db)(_lookup),
+        "pool": wrap(pooled=True, db_path=db, cached_statements=cached_statements)(_lookup),
+        "thread_local": wrap(pooled=True, mode="thread", db_path=db, cached_statements=cached_statements)(_lookup),
+    }
+
+
+def _measure(fn: Callable, calls: int, rows: int) -> List[float]:
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(user_id=i % rows + 1)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run(fn: Callable, calls: int, rows: int, threads: int) -> List[float]:
+    fn(user_id=1)  # open the connection(s) outside the timing
+    if threads == 1:
+        return _measure(fn, calls, rows)
+    results: List[List[float]] = [[] for _ in range(threads)]
+
+    def worker(i):
+        results[i] = _measure(fn, calls // threads, rows)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return [s for r in results for s in r]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="Existing database with a users table (default: temporary)")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--cached-statements", type=int, default=256,
+                        help="Statement cache of pooled connections (0 disables it)")
+    args = parser.parse_args()
+
+    tmp = None
+    db = args.db
+    if db is None:
+        tmp = tempfile.TemporaryDirectory()
+        db = os.path.join(tmp.name, "users.db")
+        _make_db(db, args.rows)
+
+    print(f"{'variant':>20} {'mean us':>9} {'p50 us':>8} {'p99 us':>8} {'calls/s':>10}")
+    for name, fn in variants(db, args.cached_statements).items():
+        samples = sorted(run(fn, args.calls, args.rows, args.threads))
+        mean = statistics.fmean(samples)
+        print(f"{name:>20} {mean * 1e6:>9.1f} {samples[len(samples) // 2] * 1e6:>8.1f} "
+              f"{samples[int(len(samples) * 0.99)] * 1e6:>8.1f} {args.threads / mean:>10,.0f}")
+    close_pools()
+    if tmp is not None:
+        tmp.cleanup()
@@ -0,0 +1,87 @@
+"""Inserts/sec: a commit per statement vs transactional batches.
+
+Usage:
+    python bench_transactions.py --rows 20000
+    python bench_transactions.py --rows 100000 --synchronous FULL --chunk-size 5000
+
+Each strategy inserts `--rows` users into a fresh temporary database:
+
+* per_statement_commit – INSERT + commit for every row (autocommit style);
+* transactional_rows – one INSERT per row, all inside one @transactional call;
+* write_batch – executemany in one transaction per `--chunk-size` rows.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from connection_pool import apply_pragmas
+from transactions import write_batch
+
+transactional = __import__('2-transactional').transactional
+
+INSERT = "INSERT INTO users (name, email) VALUES (?, ?)"
+
+
+def _rows(n: int) -> List[Tuple[str, str]]:
+    return [(f"user{i}", f"user{i}@example.com") for i in range(n)]
+
+
+def per_statement_commit(conn, rows, opts) -> None:
+    for row in rows:
+        conn.execute(INSERT, row)
+        conn.commit()
+
+
+@transactional(immediate=True)
+def _insert_all(conn, rows) -> None:
+    for row in rows:
+        conn.execute(INSERT, row)
+
+
+def transactional_rows(conn, rows, opts) -> None:
+    _insert_all(conn, rows)
+
+
+def batched(conn, rows, opts) -> None:
+    write_batch(conn, INSERT, rows, chunk_size=opts.chunk_size)
+
+
+STRATEGIES: Dict[str, Callable] = {
+    "per_statement_commit": per_statement_commit,
+    "transactional_rows": transactional_rows,
+    "write_batch": batched,
+}
+
+
+def run(name: str, opts: argparse.Namespace) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "users.db"))
+        apply_pragmas(conn, {"journal_mode": opts.journal_mode, "synchronous": opts.synchronous})
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+        conn.commit()
+        rows = _rows(opts.rows)
+        start = time.perf_counter()
+        STRATEGIES[name](conn, rows, opts)
+        elapsed = time.perf_counter() - start
+        assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == opts.rows
+        conn.close()
+    return opts.rows / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--journal-mode", default="WAL")
+    parser.add_argument("--synchronous", default="NORMAL", choices=("OFF", "NORMAL", "FULL"))
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows, journal_mode={args.journal_mode}, synchronous={args.synchronous}")
+    baseline = None
+    for name in STRATEGIES:
+        rate = run(name, args)
+        baseline = baseline or rate
+        print(f"{name:>22} {rate:>12,.0f} inserts/s {rate / baseline:>8.1f}x")
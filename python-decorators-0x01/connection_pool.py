@@ -0,0 +1,346 @@
+"""Reusable SQLite connections for the decorators in this package.
+
+Opening `users.db` on every call re-reads the file header and schema and
+throws away the connection's prepared-statement cache. The connection
+sources here keep connections open, configure them once and hand them out:
+
+* `ConnectionPool` – a bounded pool shared by all threads; a caller blocks
+  (up to `timeout`) while all `size` connections are leased.
+* `ThreadLocalConnections` – one long-lived connection per thread, closed
+  when the thread exits.
+* `AsyncConnectionPool` – the bounded pool for coroutines, built on
+  aiosqlite (imported only when used); one pool per event loop.
+
+Each connection is opened with a configurable `cached_statements` (sqlite3's
+per-connection LRU of compiled statements) and has `PRAGMAS` applied once
+when it is created:
+
+    with get_pool("users.db").lease() as conn:
+        conn.execute("SELECT * FROM users WHERE id = ?", (1,)).fetchone()
+"""
+import asyncio
+import contextlib
+import os
+import sqlite3
+import threading
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+DB_PATH = "users.db"
+
+PRAGMAS: Dict[str, object] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 << 20,
+}
+
+
+class PoolTimeout(RuntimeError):
+    """No pooled connection became free within the timeout."""
+
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, object]) -> None:
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name}={value}")
+
+
+def open_connection(
+    path: str = DB_PATH,
+    cached_statements: int = 256,
+    pragmas: Optional[Dict[str, object]] = None,
+    check_same_thread: bool = True,
+) -> sqlite3.Connection:
+    """A new connection with the statement cache sized and PRAGMAs applied."""
+    conn = sqlite3.connect(path, cached_statements=cached_statements, check_same_thread=check_same_thread)
+    apply_pragmas(conn, PRAGMAS if pragmas is None else pragmas)
+    return conn
+
+
+def _reset(conn: sqlite3.Connection) -> bool:
+    """Roll back whatever the borrower left open; False if the connection is unusable."""
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared across threads."""
+
+    def __init__(
+        self,
+        path: str = DB_PATH,
+        size: int = 5,
+        cached_statements: int = 256,
+        pragmas: Optional[Dict[str, object]] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.path = path
+        self.size = size
+        self.cached_statements = cached_statements
+        self.pragmas = pragmas
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.leases = 0
+
+    def acquire(self) -> sqlite3.Connection:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No connection to {self.path} free after {self.timeout}s")
+        with self._lock:
+            self.leases += 1
+            if self._idle:
+                return self._idle.pop()  # LIFO: the warmest statement cache
+            self.opened += 1
+        try:
+            # shared between threads, but only ever used by one borrower at a time
+            return open_connection(self.path, self.cached_statements, self.pragmas, check_same_thread=False)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if _reset(conn):
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    @contextlib.contextmanager
+    def lease(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": self.size, "idle": len(self._idle), "opened": self.opened, "leases": self.leases}
+
+
+class _Owned:
+    """A thread's slot in `ThreadLocalConnections`; freed with the thread's locals when it exits."""
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+class ThreadLocalConnections:
+    """One long-lived connection per thread; closed when its thread exits."""
+
+    def __init__(
+        self,
+        path: str = DB_PATH,
+        cached_statements: int = 256,
+        pragmas: Optional[Dict[str, object]] = None,
+    ):
+        self.path = path
+        self.cached_statements = cached_statements
+        self.pragmas = pragmas
+        self._local = threading.local()
+        self._open: Dict[sqlite3.Connection, weakref.finalize] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.leases = 0
+
+    def acquire(self) -> sqlite3.Connection:
+        owned = getattr(self._local, "owned", None)
+        if owned is None:
+            # only used by this thread, but close_all() may run on another one
+            conn = open_connection(self.path, self.cached_statements, self.pragmas, check_same_thread=False)
+            owned = self._local.owned = _Owned(conn)
+            with self._lock:
+                self._open[conn] = weakref.finalize(owned, self._retire, conn)
+                self.opened += 1
+        with self._lock:
+            self.leases += 1
+        return owned.conn
+
+    def _retire(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._open.pop(conn, None)
+        conn.close()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if not _reset(conn):
+            del self._local.owned  # its finalizer closes the connection
+
+    @contextlib.contextmanager
+    def lease(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self) -> None:
+        """Close every live thread's connection; call when those threads are done."""
+        with self._lock:
+            finalizers = list(self._open.values())
+        for finalizer in finalizers:
+            finalizer()
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, int]:
+        return {"opened": self.opened, "open": len(self._open), "leases": self.leases}
+
+
+def _aiosqlite():
+    try:
+        import aiosqlite
+    except ImportError:
+        raise ImportError("async connections need aiosqlite (pip install aiosqlite)") from None
+    return aiosqlite
+
+
+async def open_async_connection(
+    path: str = DB_PATH,
+    cached_statements: int = 256,
+    pragmas: Optional[Dict[str, object]] = None,
+):
+    """aiosqlite counterpart of `open_connection`."""
+    conn = await _aiosqlite().connect(path, cached_statements=cached_statements)
+    for name, value in (PRAGMAS if pragmas is None else pragmas).items():
+        await conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+class AsyncConnectionPool:
+    """Bounded pool of aiosqlite connections; waiting for a free one never blocks the loop."""
+
+    def __init__(
+        self,
+        path: str = DB_PATH,
+        size: int = 5,
+        cached_statements: int = 256,
+        pragmas: Optional[Dict[str, object]] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.path = path
+        self.size = size
+        self.cached_statements = cached_statements
+        self.pragmas = pragmas
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(size)
+        self._idle: list = []
+        self.opened = 0
+        self.leases = 0
+
+    async def acquire(self):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"No connection to {self.path} free after {self.timeout}s") from None
+        self.leases += 1
+        if self._idle:
+            return self._idle.pop()
+        self.opened += 1
+        try:
+            return await open_async_connection(self.path, self.cached_statements, self.pragmas)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, conn) -> None:
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+            self._idle.append(conn)
+        except sqlite3.Error:
+            await conn.close()
+        finally:
+            self._slots.release()
+
+    @contextlib.asynccontextmanager
+    async def lease(self):
+        conn = await self.acquire()
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    async def close_all(self) -> None:
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": self.size, "idle": len(self._idle), "opened": self.opened, "leases": self.leases}
+
+
+_pools: Dict[Tuple[str, str], object] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str = DB_PATH, mode: str = "pool", **options):
+    """Shared connection source for `path`; `mode` is "pool" or "thread".
+
+    `options` (size, cached_statements, pragmas, timeout) only take effect
+    when the source is first created.
+    """
+    key = (os.path.abspath(path), mode)
+    with _pools_lock:
+        source = _pools.get(key)
+        if source is None:
+            if mode == "pool":
+                source = ConnectionPool(path, **options)
+            elif mode == "thread":
+                source = ThreadLocalConnections(path, **options)
+            else:
+                raise ValueError(f"Unknown connection mode: {mode!r}")
+            _pools[key] = source
+        return source
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        sources = list(_pools.values())
+        _pools.clear()
+    for source in sources:
+        source.close_all()
+
+
+# asyncio primitives and aiosqlite connections belong to one event loop
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncConnectionPool]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_pool(path: str = DB_PATH, **options) -> AsyncConnectionPool:
+    """The running loop's shared pool for `path`; `options` apply when it is first created."""
+    pools = _async_pools.setdefault(asyncio.get_running_loop(), {})
+    key = os.path.abspath(path)
+    if key not in pools:
+        pools[key] = AsyncConnectionPool(path, **options)
+    return pools[key]
+
+
+async def close_async_pools() -> None:
+    """Close the running loop's pooled connections; await before the loop shuts down."""
+    pools = _async_pools.pop(asyncio.get_running_loop(), {})
+    for pool in pools.values():
+        await pool.close_all()
+
+
+def _forget_after_fork() -> None:
+    # a child must not share the parent's file handles; it opens its own on demand
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_after_fork)
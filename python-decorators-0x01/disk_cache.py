@@ -0,0 +1,237 @@
+"""Query-result cache in a local SQLite file, shared by every process using it.
+
+`DiskCache` follows the same interface as the in-memory `QueryCache`, so
+cache_query can use either. It can also sit below the in-memory cache:
+
+    cache = TieredCache(QueryCache(max_entries=512, ttl=30), DiskCache("query_cache.sqlite3"))
+
+    @with_db_connection
+    @cache_query(cache=cache)
+    def fetch(conn, query, params=()): ...
+
+A worker that starts up (or restarts) finds the results other workers
+already computed.
+
+* Results are pickled. Their total size is kept under `max_bytes`: after
+  each write the least recently used entries are deleted until it fits (a
+  trigger keeps the running total).
+* Entries expire after `ttl` seconds of wall-clock time, which every process
+  shares. `stale_for` keeps them a little longer for stale-while-revalidate.
+* Invalidation uses version stamps. `invalidate_tables` bumps a per-table
+  version number and deletes the entries that read the table, found via
+  the `entry_tables` index. Every entry also records the versions of its
+  tables when it was computed. A result computed before the bump is
+  therefore never stored, and an entry that slipped past the index still
+  misses on its next read.
+
+Each thread (and each forked child) opens its own connection to the file.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from query_cache import CacheKey, freeze_params, tables_in
+from transactions import transaction
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS entries ("
+    "  key BLOB PRIMARY KEY,"
+    "  value BLOB NOT NULL,"
+    "  size INTEGER NOT NULL,"
+    "  stamp TEXT NOT NULL,"
+    "  expires_at REAL,"
+    "  stale_until REAL,"
+    "  accessed_at REAL NOT NULL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS entries_lru ON entries (accessed_at)",
+    "CREATE TABLE IF NOT EXISTS table_versions ("
+    "  db TEXT NOT NULL, tbl TEXT NOT NULL, version INTEGER NOT NULL, PRIMARY KEY (db, tbl)"
+    ") WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS entry_tables ("
+    "  db TEXT NOT NULL, tbl TEXT NOT NULL, key BLOB NOT NULL, PRIMARY KEY (db, tbl, key)"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS entry_tables_key ON entry_tables (key)",
+    "CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 1), bytes INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO totals (id, bytes) VALUES (1, 0)",
+    "CREATE TRIGGER IF NOT EXISTS entries_added AFTER INSERT ON entries "
+    "BEGIN UPDATE totals SET bytes = bytes + NEW.size; END",
+    "CREATE TRIGGER IF NOT EXISTS entries_resized AFTER UPDATE OF size ON entries "
+    "BEGIN UPDATE totals SET bytes = bytes + NEW.size - OLD.size; END",
+    "CREATE TRIGGER IF NOT EXISTS entries_removed AFTER DELETE ON entries "
+    "BEGIN UPDATE totals SET bytes = bytes - OLD.size; END",
+    "CREATE TRIGGER IF NOT EXISTS entries_untracked AFTER DELETE ON entries "
+    "BEGIN DELETE FROM entry_tables WHERE key = OLD.key; END",
+]
+
+
+def _hash(key: CacheKey) -> bytes:
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+
+
+class DiskCache:
+    def __init__(self, path: str = "query_cache.sqlite3", max_bytes: int = 64 << 20, ttl: Optional[float] = None,
+                 touch_interval: float = 1.0, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # recording every read as a write would serialise readers on the write lock;
+        # recency only needs to be roughly right for eviction
+        self.touch_interval = touch_interval
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self.hits = self.misses = self.stale_hits = self.expirations = self.invalidations = self.evictions = 0
+        with transaction(self._conn(), immediate=True) as conn:
+            for sql in _SCHEMA:
+                conn.execute(sql)
+
+    def _conn(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            # autocommit; writes take the lock explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=self.busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    @staticmethod
+    def key(db: str, sql: str, params=None) -> CacheKey:
+        return db, sql, freeze_params(params)
+
+    @staticmethod
+    def _versions(conn: sqlite3.Connection, db: str, tables: Iterable[str]) -> str:
+        names = sorted(tables)
+        found = dict(conn.execute(
+            f"SELECT tbl, version FROM table_versions WHERE db = ? AND tbl IN ({', '.join('?' * len(names))})",
+            (db, *names),
+        ).fetchall()) if names else {}
+        return json.dumps([[name, found.get(name, 0)] for name in names])
+
+    def stamp(self, key: CacheKey, tables: Optional[Iterable[str]] = None) -> str:
+        return self._versions(self._conn(), key[0], tables_in(key[1]) if tables is None else tables)
+
+    def lookup(self, key: CacheKey, allow_stale: bool = False) -> Optional[Tuple[Any, bool]]:
+        conn = self._conn()
+        digest = _hash(key)
+        row = conn.execute(
+            "SELECT value, stamp, expires_at, stale_until, accessed_at FROM entries WHERE key = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        value, stamp, expires_at, stale_until, accessed_at = row
+        if stamp != self._versions(conn, key[0], (name for name, _ in json.loads(stamp))):
+            conn.execute("DELETE FROM entries WHERE key = ?", (digest,))
+            self.misses += 1
+            return None
+        now = time.time()
+        fresh = expires_at is None or expires_at > now
+        if not fresh and not (allow_stale and stale_until is not None and stale_until > now):
+            if stale_until is None or stale_until <= now:
+                conn.execute("DELETE FROM entries WHERE key = ?", (digest,))
+                self.expirations += 1
+            self.misses += 1
+            return None
+        if now - accessed_at >= self.touch_interval:
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, digest))
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return pickle.loads(value), fresh
+
+    def get(self, key: CacheKey, default=None):
+        found = self.lookup(key)
+        return default if found is None else found[0]
+
+    def set(self, key: CacheKey, value, tables: Optional[Iterable[str]] = None, ttl: Optional[float] = None,
+            stale_for: Optional[float] = None, stamp: Optional[str] = None) -> None:
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        stale_until = None if expires_at is None or stale_for is None else expires_at + stale_for
+        names = sorted({t.lower() for t in (tables_in(key[1]) if tables is None else tables)})
+        digest = _hash(key)
+        with transaction(self._conn(), immediate=True) as conn:
+            current = self._versions(conn, key[0], names)
+            if stamp is not None and stamp != current:
+                return  # a table changed while the result was computed
+            conn.execute(
+                "INSERT INTO entries (key, value, size, stamp, expires_at, stale_until, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                "value = excluded.value, size = excluded.size, stamp = excluded.stamp, "
+                "expires_at = excluded.expires_at, stale_until = excluded.stale_until, "
+                "accessed_at = excluded.accessed_at",
+                (digest, blob, len(blob), current, expires_at, stale_until, now),
+            )
+            conn.execute("DELETE FROM entry_tables WHERE key = ?", (digest,))
+            conn.executemany("INSERT INTO entry_tables (db, tbl, key) VALUES (?, ?, ?)",
+                             [(key[0], name, digest) for name in names])
+            self._evict(conn, keep=digest)
+
+    def _evict(self, conn: sqlite3.Connection, keep: bytes) -> None:
+        """Delete least recently used entries, other than `keep`, until the total fits in max_bytes."""
+        excess = conn.execute("SELECT bytes FROM totals").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries WHERE key != ? ORDER BY accessed_at", (keep,)):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def invalidate_tables(self, db: str, tables: Iterable[str]) -> int:
+        """Drop every cached result of `db` that read one of `tables`; returns how many."""
+        names: List[str] = sorted({t.lower() for t in tables})
+        if not names:
+            return 0
+        with transaction(self._conn(), immediate=True) as conn:
+            conn.executemany(
+                "INSERT INTO table_versions (db, tbl, version) VALUES (?, ?, 1) "
+                "ON CONFLICT(db, tbl) DO UPDATE SET version = version + 1",
+                [(db, name) for name in names],
+            )
+            dropped = conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                f"(SELECT key FROM entry_tables WHERE db = ? AND tbl IN ({', '.join('?' * len(names))}))",
+                (db, *names),
+            ).rowcount
+        self.invalidations += dropped
+        return dropped
+
+    def clear(self) -> None:
+        with transaction(self._conn(), immediate=True) as conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, int]:
+        entries, nbytes = self._conn().execute(
+            "SELECT (SELECT COUNT(*) FROM entries), (SELECT bytes FROM totals)"
+        ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local = threading.local()
+
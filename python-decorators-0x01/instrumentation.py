@@ -0,0 +1,216 @@
+"""Query instrumentation that stays off the hot path.
+
+`instrument_queries` times the decorated call and emits one structured event
+per query: SQL, duration, row count, redacted parameters and the calling
+function. Events go to the "queries" logger, which `configure_query_logging`
+wires to a `QueueHandler`. The calling thread only enqueues the record; a
+`QueueListener` thread formats it as JSON and does the I/O. If the logger has
+no handlers when a function is first decorated, JSON lines on stderr are set
+up automatically; a later `configure_query_logging(handlers)` replaces them.
+
+Only a `sample_rate` fraction of queries is logged. Any query slower than
+`slow_ms` is always logged, at WARNING.
+
+    configure_query_logging()               # JSON lines on stderr
+    @instrument_queries(sample_rate=0.01, slow_ms=50)
+    def fetch(conn, query, params=()): ...
+"""
+import atexit
+import functools
+import inspect
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger("queries")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_auto = False  # installed by instrument_queries rather than by the application
+_listener_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level and the query event fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {"ts": round(record.created, 6), "level": record.levelname}
+        event.update(getattr(record, "query_event", None) or {"message": record.getMessage()})
+        return json.dumps(event, default=str)
+
+
+def configure_query_logging(handlers: Optional[Iterable[logging.Handler]] = None,
+                            level: int = logging.INFO, maxsize: int = 10_000) -> logging.Logger:
+    """Route the "queries" logger through a queue to `handlers` (default: JSON on stderr).
+
+    When the queue is full, records are dropped rather than blocking the caller.
+    Replaces the default set up by `instrument_queries`; otherwise only the
+    first call has an effect.
+    """
+    global _listener_auto
+    with _listener_lock:
+        if _listener is not None and not _listener_auto:
+            return logger
+        _stop_listener()
+        _listener_auto = False
+        _start_listener(handlers, level, maxsize)
+    return logger
+
+
+def _default_query_logging() -> None:
+    """JSON lines on stderr, unless someone already attached handlers to the "queries" logger."""
+    global _listener_auto
+    with _listener_lock:
+        if _listener is not None or logger.handlers:
+            return
+        _start_listener(None, logging.INFO, 10_000)
+        _listener_auto = True
+
+
+def _start_listener(handlers: Optional[Iterable[logging.Handler]], level: int, maxsize: int) -> None:
+    global _listener
+    if handlers is None:
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(JsonFormatter())
+        handlers = [stream]
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize)
+    logger.addHandler(_DroppingQueueHandler(records))
+    logger.setLevel(level)
+    logger.propagate = False
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.unregister(stop_query_logging)  # registered once however often it restarts
+    atexit.register(stop_query_logging)
+
+
+def stop_query_logging() -> None:
+    """Flush the queue and stop the listener thread."""
+    global _listener_auto
+    with _listener_lock:
+        _stop_listener()
+        _listener_auto = False
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    for handler in list(logger.handlers):
+        if isinstance(handler, _DroppingQueueHandler):
+            logger.removeHandler(handler)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+def redact(params) -> Any:
+    """Parameter shapes without their values: (42, 'bob') -> ['<int>', '<str>']."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: f"<{type(v).__name__}>" for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [f"<{type(v).__name__}>" for v in params]
+    return f"<{type(params).__name__}>"
+
+
+def _row_count(result) -> Optional[int]:
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    rowcount = getattr(result, "rowcount", -1)
+    return rowcount if rowcount >= 0 else None
+
+
+def _caller(depth: int) -> str:
+    frame = sys._getframe(depth)
+    return f"{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+def query_argument(args, kwargs, name: str, position: int, default=None):
+    """`name` keyword, else the positional argument at `position`, else `default`."""
+    if name in kwargs:
+        return kwargs[name]
+    return args[position] if len(args) > position else default
+
+
+def _emit(log: logging.Logger, func, args, kwargs, query_position: int, elapsed_ms: float,
+          result, error: Optional[BaseException], sample_rate: float, slow_ms: Optional[float]) -> None:
+    slow = slow_ms is not None and elapsed_ms >= slow_ms
+    if not (slow or error is not None or sample_rate >= 1.0 or random.random() < sample_rate):
+        return
+    level = logging.WARNING if slow or error is not None else logging.INFO
+    if not log.isEnabledFor(level):
+        return
+    event: Dict[str, Any] = {
+        "query": query_argument(args, kwargs, "query", query_position, "UNKNOWN QUERY"),
+        "params": redact(query_argument(args, kwargs, "params", query_position + 1)),
+        "duration_ms": round(elapsed_ms, 3),
+        "rows": _row_count(result),
+        "caller": _caller(3),  # _caller <- _emit <- wrapper <- caller
+        "function": func.__qualname__,
+        "slow": slow,
+    }
+    if error is not None:
+        event["error"] = repr(error)
+    log.log(level, "query", extra={"query_event": event})
+
+
+def instrument_queries(func=None, *, sample_rate: float = 1.0, slow_ms: Optional[float] = 100.0,
+                       log: Optional[logging.Logger] = None, query_position: int = 0):
+    """Log the query behind each call; see the module docstring.
+
+    The SQL is the `query` keyword or the positional argument at
+    `query_position`; parameters are the `params` keyword or the one after it.
+    Coroutine functions are timed until their result is ready.
+    """
+    if func is None:
+        return functools.partial(instrument_queries, sample_rate=sample_rate, slow_ms=slow_ms,
+                                 log=log, query_position=query_position)
+    if log is None:
+        log = logger
+        _default_query_logging()
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            error = result = None
+            try:
+                result = await func(*args, **kwargs)
+                return result
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _emit(log, func, args, kwargs, query_position, (time.perf_counter() - start) * 1000,
+                      result, error, sample_rate, slow_ms)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        error = result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _emit(log, func, args, kwargs, query_position, (time.perf_counter() - start) * 1000,
+                  result, error, sample_rate, slow_ms)
+    return wrapper
@@ -0,0 +1,351 @@
+"""Bounded query-result cache used by the cache_query decorator.
+
+`QueryCache` is an LRU keyed by (database path, SQL text, bind parameters):
+
+* bounded by `max_entries` and/or `max_bytes` (an estimate of the result
+  size); the least recently used entries are evicted first;
+* every entry expires after `ttl` seconds (per cache, overridable per entry);
+  with `stale_for` an expired entry is kept that much longer so `lookup`
+  can still serve it while a fresh value is computed;
+* entries remember the tables their query read, and `invalidate_tables`
+  drops every entry that touched a table – cache_query calls it whenever a
+  write (INSERT/UPDATE/DELETE/REPLACE) goes through it;
+* hits, misses, evictions, expirations and invalidations are counted in
+  `stats()`.
+
+Every cache also hands out a `stamp` for a key: the version of each table
+the query reads, taken before the query runs. `set(..., stamp=...)` ignores
+a result whose tables were invalidated while it was being computed.
+Caches following the `CacheBackend` interface (this one, `DiskCache` in
+disk_cache.py) can be stacked with `TieredCache`.
+
+`SingleFlight` coalesces concurrent computations of the same key so a burst
+of misses runs the query once.
+
+The cache is thread-safe; results are shared, so treat them as read-only.
+"""
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, NamedTuple, Optional, Protocol, Set, Tuple
+
+_TABLE_RE = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE|TABLE)\s+[\"`\[]?(\w+)", re.IGNORECASE)
+_WRITE_RE = re.compile(r"^\s*(?:INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b", re.IGNORECASE)
+
+CacheKey = Tuple[str, str, Hashable]
+
+
+def tables_in(sql: str) -> Set[str]:
+    """Lower-cased names of the tables a statement reads or writes."""
+    return {name.lower() for name in _TABLE_RE.findall(sql)}
+
+
+def is_write(sql: str) -> bool:
+    return bool(_WRITE_RE.match(sql))
+
+
+def freeze_params(params) -> Hashable:
+    """Bind parameters as a hashable cache-key component."""
+    if params is None:
+        return ()
+    if isinstance(params, dict):
+        return tuple(sorted(params.items()))
+    return tuple(params)
+
+
+def database_path(conn) -> str:
+    """File behind the connection's main schema ("" for an in-memory database)."""
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return path
+    return ""
+
+
+async def adatabase_path(conn) -> str:
+    """`database_path` for an aiosqlite connection."""
+    async with conn.execute("PRAGMA database_list") as cursor:
+        for _, name, path in await cursor.fetchall():
+            if name == "main":
+                return path
+    return ""
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory held by a query result (a list of row tuples)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item) if isinstance(item, (list, tuple)) else sys.getsizeof(item)
+    return size
+
+
+class CacheBackend(Protocol):
+    """What cache_query needs from a cache."""
+
+    def key(self, db: str, sql: str, params=None) -> CacheKey: ...
+
+    def stamp(self, key: CacheKey, tables: Optional[Iterable[str]] = None) -> Hashable: ...
+
+    def lookup(self, key: CacheKey, allow_stale: bool = False) -> Optional[Tuple[Any, bool]]: ...
+
+    def get(self, key: CacheKey, default=None): ...
+
+    def set(self, key: CacheKey, value, tables: Optional[Iterable[str]] = None, ttl: Optional[float] = None,
+            stale_for: Optional[float] = None, stamp: Optional[Hashable] = None) -> None: ...
+
+    def invalidate_tables(self, db: str, tables: Iterable[str]) -> int: ...
+
+    def clear(self) -> None: ...
+
+    def stats(self) -> Dict: ...
+
+
+class _Entry(NamedTuple):
+    value: Any
+    size: int
+    expires_at: Optional[float]
+    stale_until: Optional[float]
+    tables: frozenset
+
+
+class QueryCache:
+    def __init__(self, max_entries: Optional[int] = 1024, max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._by_table: Dict[Tuple[str, str], Set[CacheKey]] = {}
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.stale_hits = self.evictions = self.expirations = self.invalidations = 0
+
+    @staticmethod
+    def key(db: str, sql: str, params=None) -> CacheKey:
+        return db, sql, freeze_params(params)
+
+    def stamp(self, key: CacheKey, tables: Optional[Iterable[str]] = None) -> Tuple[Tuple[str, int], ...]:
+        names = sorted(tables_in(key[1]) if tables is None else tables)
+        return tuple((name, self._versions.get((key[0], name), 0)) for name in names)
+
+    def lookup(self, key: CacheKey, allow_stale: bool = False) -> Optional[Tuple[Any, bool]]:
+        """`(value, fresh)` for a cached key, or None on a miss.
+
+        An expired entry still inside its `stale_for` window is returned as
+        `(value, False)` when `allow_stale` is set, and is a miss otherwise.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            now = time.monotonic()
+            if entry.expires_at is not None and entry.expires_at <= now:
+                if entry.stale_until is None or entry.stale_until <= now:
+                    self._drop(key)
+                    self.expirations += 1
+                elif allow_stale:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    return entry.value, False
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value, True
+
+    def get(self, key: CacheKey, default=None):
+        found = self.lookup(key)
+        return default if found is None else found[0]
+
+    def set(self, key: CacheKey, value, tables: Optional[Iterable[str]] = None, ttl: Optional[float] = None,
+            stale_for: Optional[float] = None, stamp: Optional[Hashable] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        size = estimate_size(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        stale_until = None if expires_at is None or stale_for is None else expires_at + stale_for
+        entry = _Entry(value, size, expires_at, stale_until,
+                       frozenset(tables_in(key[1]) if tables is None else tables))
+        with self._lock:
+            if stamp is not None and stamp != self.stamp(key, entry.tables):
+                return  # a table changed while the result was computed
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self.bytes += size
+            for table in entry.tables:
+                self._by_table.setdefault((key[0], table), set()).add(key)
+            self._shrink()
+
+    def _drop(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get((key[0], table))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[(key[0], table)]
+
+    def _shrink(self) -> None:
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate_tables(self, db: str, tables: Iterable[str]) -> int:
+        """Drop every cached result of `db` that read one of `tables`; returns how many."""
+        with self._lock:
+            keys = set()
+            for table in tables:
+                table = table.lower()
+                self._versions[(db, table)] = self._versions.get((db, table), 0) + 1
+                keys |= self._by_table.get((db, table), set())
+            for key in keys:
+                self._drop(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: CacheKey) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class TieredCache:
+    """Caches stacked fastest first, e.g. `TieredCache(QueryCache(), DiskCache())`.
+
+    Reads try each layer in turn and copy a hit from a lower layer into the
+    layers above it. Writes and invalidations go to every layer. An entry in
+    an upper layer keeps the stamp of the last (shared) layer and is checked
+    against it on every hit. That way an invalidation made by another process
+    through the shared layer also applies to this process's memory.
+    """
+
+    def __init__(self, *layers: CacheBackend):
+        if not layers:
+            raise ValueError("TieredCache needs at least one layer")
+        self.layers = layers
+        self.shared = layers[-1]
+
+    def key(self, db: str, sql: str, params=None) -> CacheKey:
+        return self.shared.key(db, sql, params)
+
+    def stamp(self, key: CacheKey, tables: Optional[Iterable[str]] = None) -> Hashable:
+        return self.shared.stamp(key, tables)
+
+    def lookup(self, key: CacheKey, allow_stale: bool = False) -> Optional[Tuple[Any, bool]]:
+        current = None
+        for depth, layer in enumerate(self.layers[:-1]):
+            found = layer.lookup(key, allow_stale)
+            if found is None:
+                continue
+            (stamp, value), fresh = found
+            if current is None:
+                current = self.shared.stamp(key)
+            if stamp == current:
+                if fresh:
+                    self._promote(key, value, stamp, depth)
+                return value, fresh
+        found = self.shared.lookup(key, allow_stale)
+        if found is not None and found[1] and len(self.layers) > 1:
+            self._promote(key, found[0], current if current is not None else self.shared.stamp(key),
+                          len(self.layers) - 1)
+        return found
+
+    def _promote(self, key: CacheKey, value, stamp: Hashable, depth: int) -> None:
+        for layer in self.layers[:depth]:
+            layer.set(key, (stamp, value))
+
+    def get(self, key: CacheKey, default=None):
+        found = self.lookup(key)
+        return default if found is None else found[0]
+
+    def set(self, key: CacheKey, value, tables: Optional[Iterable[str]] = None, ttl: Optional[float] = None,
+            stale_for: Optional[float] = None, stamp: Optional[Hashable] = None) -> None:
+        stamp = self.shared.stamp(key, tables) if stamp is None else stamp
+        self.shared.set(key, value, tables, ttl, stale_for, stamp)
+        for layer in self.layers[:-1]:
+            layer.set(key, (stamp, value), tables, ttl, stale_for)
+
+    def invalidate_tables(self, db: str, tables: Iterable[str]) -> int:
+        tables = list(tables)
+        return sum(layer.invalidate_tables(db, tables) for layer in self.layers)
+
+    def clear(self) -> None:
+        for layer in self.layers:
+            layer.clear()
+
+    def stats(self) -> Dict:
+        return {"layers": [layer.stats() for layer in self.layers]}
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run `fn` once per key at a time; concurrent callers wait and share its outcome."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def do(self, key: Hashable, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
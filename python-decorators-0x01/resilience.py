@@ -0,0 +1,263 @@
+"""Retries with jittered backoff and per-resource circuit breakers.
+
+`retry` re-runs a call only when the error is worth retrying (see
+`is_retryable`: "database is locked"/"busy" and similar transient failures by
+default). After failed attempt n it waits a random time between 0 and
+`min(max_delay, base_delay * 2**(n - 1))` ("full jitter"), so contending
+callers spread out instead of retrying in lockstep. It stops once `retries`
+attempts or the `max_elapsed` budget are used up.
+
+A `CircuitBreaker` per resource (e.g. the database path) counts consecutive
+transient failures. After `failure_threshold` of them it opens and every
+call fails fast with `CircuitOpenError` for `reset_timeout` seconds. It then
+lets a trial call through (half-open) and closes again if that succeeds.
+
+    @retry(retries=5, base_delay=0.05, max_elapsed=2.0, breaker="users.db")
+    def fetch(conn): ...
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, Type, Union
+
+log = logging.getLogger("resilience")
+
+TRANSIENT_MESSAGES = ("database is locked", "database is busy", "database table is locked", "disk i/o error")
+
+
+class CircuitOpenError(RuntimeError):
+    """The resource's circuit breaker is open; the call was not attempted."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Default classification: lock/busy contention and connection-level errors."""
+    if isinstance(exc, sqlite3.OperationalError):
+        message = str(exc).lower()
+        return any(m in message for m in TRANSIENT_MESSAGES)
+    return isinstance(exc, (TimeoutError, ConnectionError))
+
+
+def full_jitter(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Delay before retry number `attempt` (1-based)."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._outage_started = 0.0  # when it last opened from CLOSED; failed trials don't reset it
+        self._trial_running = False
+        self.calls = self.successes = self.failures = self.rejected = self.opened = 0
+        self.last_recovery_s: Optional[float] = None
+        self.total_open_s = 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; counts it as rejected otherwise."""
+        with self._lock:
+            if self.state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self._trial_running):
+                self._trial_running = self.state == self.HALF_OPEN
+                self.calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self._failures = 0
+            self._trial_running = False
+            if self.state != self.CLOSED:
+                self.last_recovery_s = self._clock() - self._outage_started
+                self.total_open_s += self.last_recovery_s
+                log.info("circuit %s closed after %.3fs", self.name, self.last_recovery_s)
+            self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                now = self._clock()
+                if self.state == self.CLOSED:
+                    self._outage_started = now
+                if self.state != self.OPEN:
+                    self.opened += 1
+                    log.warning("circuit %s opened after %d failures", self.name, self._failures)
+                self.state = self.OPEN
+                self._opened_at = now
+
+    def release(self) -> None:
+        """The admitted call ended without telling us anything about the resource."""
+        with self._lock:
+            self._trial_running = False
+
+    def stats(self) -> Dict[str, Union[None, str, int, float]]:
+        """Counters, plus how long the last outage lasted (open until closed again) and all outages in total."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "opened": self.opened,
+                "last_recovery_s": self.last_recovery_s,
+                "total_open_s": self.total_open_s,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(resource: str, **options) -> CircuitBreaker:
+    """The shared breaker for `resource`; `options` apply when it is first created."""
+    with _breakers_lock:
+        breaker = _breakers.get(resource)
+        if breaker is None:
+            breaker = _breakers[resource] = CircuitBreaker(resource, **options)
+        return breaker
+
+
+def breaker_stats() -> Dict[str, Dict]:
+    with _breakers_lock:
+        return {name: b.stats() for name, b in _breakers.items()}
+
+
+RetryOn = Union[Callable[[BaseException], bool], Tuple[Type[BaseException], ...]]
+
+
+def _classifier(retry_on: RetryOn) -> Callable[[BaseException], bool]:
+    if isinstance(retry_on, tuple):
+        return lambda exc: isinstance(exc, retry_on)
+    return retry_on
+
+
+def retry(func=None, *, retries: int = 3, base_delay: float = 0.1, max_delay: float = 2.0,
+          max_elapsed: Optional[float] = None, retry_on: RetryOn = is_retryable,
+          breaker: Union[None, str, CircuitBreaker] = None, sleep: Optional[Callable] = None):
+    """Retry transient failures; see the module docstring.
+
+    `retries` is the total number of attempts. `retry_on` is a predicate or a
+    tuple of exception types. `breaker` is a CircuitBreaker or a resource
+    name to share one through `get_breaker`. Coroutine functions back off with
+    `asyncio.sleep` (or an async `sleep`) instead of blocking the event loop.
+    The wrapper's `stats` dict counts calls, retries and calls that gave up.
+    """
+    if func is None:
+        return functools.partial(retry, retries=retries, base_delay=base_delay, max_delay=max_delay,
+                                 max_elapsed=max_elapsed, retry_on=retry_on, breaker=breaker, sleep=sleep)
+    retryable = _classifier(retry_on)
+    circuit = get_breaker(breaker) if isinstance(breaker, str) else breaker
+    stats = {"calls": 0, "retries": 0, "gave_up": 0}
+    stats_lock = threading.Lock()  # the wrapper is shared by every thread calling it
+
+    def count(name: str, n: int = 1) -> None:
+        with stats_lock:
+            stats[name] += n
+
+    def admit() -> None:
+        if circuit is not None and not circuit.allow():
+            count("gave_up")
+            raise CircuitOpenError(f"circuit {circuit.name} is open")
+
+    def succeeded() -> None:
+        if circuit is not None:
+            circuit.record_success()
+
+    def interrupted() -> None:
+        if circuit is not None:
+            circuit.release()
+
+    def failed(exc: Exception, attempt: int, start: float) -> Optional[float]:
+        """Delay before the next attempt, or None to give up and re-raise `exc`."""
+        transient = retryable(exc)
+        if circuit is not None and transient:
+            circuit.record_failure()
+        elif circuit is not None:
+            circuit.release()  # a bad query says nothing about the database's health
+        tripped = circuit is not None and circuit.state == CircuitBreaker.OPEN
+        if not transient or tripped or attempt >= retries:
+            count("gave_up", int(transient))
+            return None
+        delay = full_jitter(attempt, base_delay, max_delay)
+        if max_elapsed is not None and time.monotonic() - start + delay > max_elapsed:
+            count("gave_up")
+            return None
+        log.warning("attempt %d of %s failed with %r; retrying in %.3fs", attempt, func.__qualname__, exc, delay)
+        count("retries")
+        return delay
+
+    if inspect.iscoroutinefunction(func):
+        async_sleep = sleep or asyncio.sleep
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            count("calls")
+            start = time.monotonic()
+            attempt = 0
+            while True:
+                attempt += 1
+                admit()
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    delay = failed(e, attempt, start)
+                    if delay is None:
+                        raise
+                    await async_sleep(delay)
+                except BaseException:  # cancelled
+                    interrupted()
+                    raise
+                else:
+                    succeeded()
+                    return result
+
+        async_wrapper.stats = stats
+        return async_wrapper
+
+    sync_sleep = sleep or time.sleep
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        count("calls")
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            admit()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                delay = failed(e, attempt, start)
+                if delay is None:
+                    raise
+                sync_sleep(delay)
+            except BaseException:
+                interrupted()
+                raise
+            else:
+                succeeded()
+                return result
+
+    wrapper.stats = stats
+    return wrapper
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Unit tests for coalescing concurrent cache misses:
+- SingleFlight
+- cache_query on coroutine functions (one leader, waiters shielded,
+  one background refresh for concurrent stale hits)
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from query_cache import QueryCache, SingleFlight
+
+from connection_pool import close_async_pools
+
+cache_query = __import__('4-cache_query').cache_query
+
+try:
+    import aiosqlite
+except ImportError:  # pragma: no cover
+    aiosqlite = None
+
+QUERY = "SELECT name FROM users ORDER BY id"
+
+
+def _wait_for(predicate, timeout=5.0):
+    """Poll `predicate` until it holds or `timeout` seconds pass."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for callers to line up")
+        time.sleep(0.001)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for SingleFlight.do."""
+
+    WAITERS = 4
+
+    def _run_concurrently(self, flights, fn):
+        """Start WAITERS + 1 threads calling `flights.do("k", fn)`; return (threads, results, errors)."""
+        results, errors = [], []
+
+        def call():
+            try:
+                results.append(flights.do("k", fn))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(self.WAITERS + 1)]
+        for t in threads:
+            t.start()
+        return threads, results, errors
+
+    def test_waiters_share_the_result(self):
+        """Concurrent callers run `fn` once and all get its value."""
+        flights, release, calls = SingleFlight(), threading.Event(), []
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return object()
+
+        threads, results, errors = self._run_concurrently(flights, fn)
+        _wait_for(lambda: flights.coalesced == self.WAITERS)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), self.WAITERS + 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertFalse(flights.in_flight("k"))
+
+    def test_waiters_share_the_exception(self):
+        """When `fn` raises, every waiter re-raises the same exception."""
+        flights, release = SingleFlight(), threading.Event()
+        boom = ValueError("boom")
+
+        def fn():
+            release.wait(5)
+            raise boom
+
+        threads, results, errors = self._run_concurrently(flights, fn)
+        _wait_for(lambda: flights.coalesced == self.WAITERS)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), self.WAITERS + 1)
+        self.assertTrue(all(e is boom for e in errors))
+        self.assertFalse(flights.in_flight("k"))
+
+    def test_next_call_after_failure_runs_again(self):
+        """A failed flight is not remembered."""
+        flights = SingleFlight()
+        with self.assertRaises(KeyError):
+            flights.do("k", lambda: {}["missing"])
+        self.assertEqual(flights.do("k", lambda: 42), 42)
+
+
+@unittest.skipIf(aiosqlite is None, "aiosqlite is not installed")
+class TestAsyncCacheQuery(unittest.IsolatedAsyncioTestCase):
+    """Test cases for cache_query wrapping a coroutine function."""
+
+    def setUp(self):
+        """Create a users table in a temporary database file."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "users.db")
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany("INSERT INTO users (name) VALUES (?)", [("ada",), ("alan",)])
+        conn.commit()
+        conn.close()
+
+    async def asyncSetUp(self):
+        self.conn = await aiosqlite.connect(self.path)
+        self.addAsyncCleanup(self.conn.close)
+        self.addAsyncCleanup(close_async_pools)  # stale-while-revalidate refreshes lease from it
+        self.release = asyncio.Event()
+        self.started = 0
+
+    def _fetch(self, fail=False, cache=None, **options):
+        """A cached query that blocks until `self.release` is set."""
+        @cache_query(cache=QueryCache() if cache is None else cache, db_path=self.path, **options)
+        async def fetch(conn, query):
+            self.started += 1
+            await self.release.wait()
+            if fail:
+                raise sqlite3.OperationalError("database is locked")
+            async with conn.execute(query) as cur:
+                return await cur.fetchall()
+        return fetch
+
+    async def _settle(self):
+        """Let every started task reach its first await."""
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    async def test_waiters_share_the_result(self):
+        """Concurrent misses run the query once."""
+        fetch = self._fetch()
+        tasks = [asyncio.create_task(fetch(self.conn, QUERY)) for _ in range(5)]
+        await self._settle()
+        self.release.set()
+        results = await asyncio.gather(*tasks)
+        self.assertEqual(self.started, 1)
+        self.assertEqual(results, [[("ada",), ("alan",)]] * 5)
+        self.assertEqual(await fetch(self.conn, QUERY), results[0])
+        self.assertEqual(self.started, 1)
+
+    async def test_waiters_share_the_exception(self):
+        """When the leader's query raises, the waiters raise it too."""
+        fetch = self._fetch(fail=True)
+        tasks = [asyncio.create_task(fetch(self.conn, QUERY)) for _ in range(3)]
+        await self._settle()
+        self.release.set()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertEqual(self.started, 1)
+        self.assertTrue(all(isinstance(o, sqlite3.OperationalError) for o in outcomes))
+
+    async def test_cancelled_leader_hands_over(self):
+        """Cancelling the leader makes a waiter run the query instead of failing."""
+        fetch = self._fetch()
+        leader = asyncio.create_task(fetch(self.conn, QUERY))
+        await self._settle()
+        waiters = [asyncio.create_task(fetch(self.conn, QUERY)) for _ in range(2)]
+        await self._settle()
+        leader.cancel()
+        await self._settle()
+        self.release.set()
+        results = await asyncio.gather(*waiters)
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(self.started, 2)
+        self.assertEqual(results, [[("ada",), ("alan",)]] * 2)
+
+    async def test_cancelled_waiter_leaves_the_leader_running(self):
+        """A waiter's own cancellation does not reach the shared query."""
+        fetch = self._fetch()
+        leader = asyncio.create_task(fetch(self.conn, QUERY))
+        await self._settle()
+        waiter = asyncio.create_task(fetch(self.conn, QUERY))
+        await self._settle()
+        waiter.cancel()
+        await self._settle()
+        self.release.set()
+        self.assertEqual(await leader, [("ada",), ("alan",)])
+        self.assertTrue(waiter.cancelled())
+        self.assertEqual(self.started, 1)
+
+    async def test_concurrent_stale_hits_refresh_once(self):
+        """Stale hits in the same loop tick serve the old result and start a single refresh."""
+        cache = QueryCache(ttl=0.01)
+        fetch = self._fetch(cache=cache, stale_while_revalidate=60)
+        self.release.set()
+        expected = await fetch(self.conn, QUERY)
+        await asyncio.sleep(0.02)
+        self.release.clear()
+        key = cache.key(self.path, QUERY, None)
+        with self.assertNoLogs("4-cache_query", level="WARNING"):
+            results = await asyncio.gather(*(fetch(self.conn, QUERY) for _ in range(5)))
+            for _ in range(500):
+                if self.started >= 2:
+                    break  # a refresh is waiting on `release`
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.05)  # time for any duplicate refresh to start too
+            self.assertEqual(self.started, 2)
+            self.release.set()
+            for _ in range(500):
+                if cache.lookup(key, allow_stale=True)[1]:
+                    break  # the refresh stored a fresh result
+                await asyncio.sleep(0.001)
+            await self._settle()
+        self.assertEqual(results, [expected] * 5)
+        self.assertEqual(self.started, 2)
+
+if __name__ == "__main__":
+    unittest.main()
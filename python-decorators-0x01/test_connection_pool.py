@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the per-thread connection source:
+- one connection per thread, reused across leases
+- a thread's connection closed once the thread exits
+- close_all and unusable connections
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from connection_pool import ThreadLocalConnections
+
+
+class TestThreadLocalConnections(unittest.TestCase):
+    """Test cases for ThreadLocalConnections."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.source = ThreadLocalConnections(os.path.join(tmp.name, "users.db"))
+        self.addCleanup(self.source.close_all)
+
+    def in_thread(self, func):
+        """Run `func` in a new thread that has exited when this returns; returns its result."""
+        result = []
+        thread = threading.Thread(target=lambda: result.append(func()))
+        thread.start()
+        thread.join()
+        return result[0]
+
+    def lease_twice(self):
+        with self.source.lease() as first:
+            pass
+        with self.source.lease() as second:
+            pass
+        return first, second
+
+    def test_connection_reused_within_thread(self):
+        """A thread gets the same connection each time; another thread gets its own."""
+        first, second = self.lease_twice()
+        self.assertIs(first, second)
+        with self.source.lease() as conn:
+            self.assertIsNot(self.in_thread(self.source.acquire), conn)
+        self.assertEqual(self.source.stats()["leases"], 4)
+
+    def test_released_when_thread_exits(self):
+        """The connection of a thread that has exited is closed and no longer tracked."""
+        conn = self.in_thread(self.source.acquire)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+        self.assertEqual(self.source.stats(), {"opened": 1, "open": 0, "leases": 1})
+
+    def test_thread_churn_does_not_accumulate(self):
+        """Many short-lived threads leave no open connections behind."""
+        for _ in range(20):
+            self.in_thread(self.lease_twice)
+        stats = self.source.stats()
+        self.assertEqual((stats["opened"], stats["open"], stats["leases"]), (20, 0, 40))
+
+    def test_leases_counted_across_threads(self):
+        """Concurrent leases are all counted."""
+        def work():
+            for _ in range(500):
+                with self.source.lease():
+                    pass
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.source.stats()["leases"], 4000)
+
+    def test_close_all(self):
+        """close_all closes live threads' connections; the next lease opens a fresh one."""
+        conn = self.source.acquire()
+        self.source.close_all()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+        self.assertIsNot(self.source.acquire(), conn)
+        self.assertEqual(self.source.stats()["open"], 1)
+
+    def test_unusable_connection_replaced(self):
+        """A connection that cannot be reset is closed and replaced on the next lease."""
+        with self.source.lease() as conn:
+            conn.execute("CREATE TABLE users (id INTEGER)")
+            conn.execute("INSERT INTO users VALUES (1)")
+            conn.close()  # rollback on release now fails
+        with self.source.lease() as fresh:
+            self.assertIsNot(fresh, conn)
+            fresh.execute("SELECT 1")
+        self.assertEqual(self.source.stats()["open"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
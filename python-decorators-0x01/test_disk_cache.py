@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared on-disk query cache:
+- DiskCache (stamps, byte-bounded eviction, cross-process invalidation)
+- TieredCache over a DiskCache
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from disk_cache import DiskCache
+from query_cache import QueryCache, TieredCache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DB = "/data/users.db"
+QUERY = "SELECT name FROM users"
+
+
+class DiskCacheTestCase(unittest.TestCase):
+    """Gives each test its own cache file."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "query_cache.sqlite3")
+
+    def open_cache(self, **options):
+        cache = DiskCache(self.path, **options)
+        self.addCleanup(cache.close)
+        return cache
+
+    def in_other_process(self, code):
+        """Run `code` in a fresh interpreter with `cache` opened on the same file."""
+        script = f"from disk_cache import DiskCache\ncache = DiskCache({self.path!r})\n" + textwrap.dedent(code)
+        subprocess.run([sys.executable, "-c", script], cwd=HERE, check=True, timeout=60)
+
+
+class TestDiskCache(DiskCacheTestCase):
+    """Test cases for DiskCache."""
+
+    def test_set_then_lookup(self):
+        """A stored result is returned fresh."""
+        cache = self.open_cache()
+        key = cache.key(DB, QUERY, ())
+        cache.set(key, [("ada",)])
+        self.assertEqual(cache.lookup(key), ([("ada",)], True))
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_set_rejects_outdated_stamp(self):
+        """A result computed before its table was invalidated is not stored."""
+        cache = self.open_cache()
+        key = cache.key(DB, QUERY, ())
+        stamp = cache.stamp(key)
+        cache.invalidate_tables(DB, ["users"])
+        cache.set(key, [("stale",)], stamp=stamp)
+        self.assertIsNone(cache.lookup(key))
+        cache.set(key, [("ada",)], stamp=cache.stamp(key))
+        self.assertEqual(cache.get(key), [("ada",)])
+
+    def test_invalidation_drops_entries_of_the_table(self):
+        """Invalidating a table drops and counts its entries at once, in that database only."""
+        cache = self.open_cache()
+        users = cache.key(DB, QUERY, ())
+        joined = cache.key(DB, "SELECT * FROM orders JOIN users ON users.id = orders.user_id", ())
+        orders = cache.key(DB, "SELECT * FROM orders", ())
+        other_db = cache.key("/data/other.db", QUERY, ())
+        for key in (users, joined, orders, other_db):
+            cache.set(key, key[1])
+        self.assertEqual(cache.invalidate_tables(DB, ["USERS"]), 2)
+        stats = cache.stats()
+        self.assertEqual((stats["invalidations"], stats["entries"]), (2, 2))
+        self.assertIsNone(cache.lookup(users))
+        self.assertIsNone(cache.lookup(joined))
+        self.assertIsNotNone(cache.lookup(orders))
+        self.assertIsNotNone(cache.lookup(other_db))
+        self.assertEqual(cache.stats()["invalidations"], 2)
+
+    def test_outdated_entry_misses(self):
+        """An entry whose recorded versions are behind the tables' misses even if the index lost it."""
+        cache = self.open_cache()
+        key = cache.key(DB, QUERY, ())
+        cache.set(key, [("ada",)])
+        cache._conn().execute("DELETE FROM entry_tables")
+        self.assertEqual(cache.invalidate_tables(DB, ["users"]), 0)
+        self.assertIsNone(cache.lookup(key))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_evicts_down_to_max_bytes(self):
+        """Total stored bytes stay under max_bytes without evicting more than needed."""
+        cache = self.open_cache(max_bytes=4096)
+        keys = [cache.key(DB, QUERY, (i,)) for i in range(20)]
+        for i, key in enumerate(keys):
+            cache.set(key, b"x" * 1000 + bytes([i]))
+            self.assertLessEqual(cache.stats()["bytes"], 4096)
+        stats = cache.stats()
+        self.assertGreater(stats["evictions"], 0)
+        self.assertEqual(stats["entries"], 4096 // (stats["bytes"] // stats["entries"]))
+        self.assertIsNotNone(cache.lookup(keys[-1]))
+        self.assertIsNone(cache.lookup(keys[0]))
+
+    def test_oversized_value_is_not_stored(self):
+        """A value larger than max_bytes is skipped rather than evicting everything."""
+        cache = self.open_cache(max_bytes=1024)
+        small = cache.key(DB, QUERY, (1,))
+        cache.set(small, "small")
+        cache.set(cache.key(DB, QUERY, (2,)), "x" * 4096)
+        self.assertEqual(cache.get(small), "small")
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_entries_are_shared_across_processes(self):
+        """A result stored by one process is a hit in another."""
+        self.in_other_process("cache.set(cache.key(%r, %r, ()), [('ada',)])" % (DB, QUERY))
+        cache = self.open_cache()
+        self.assertEqual(cache.get(cache.key(DB, QUERY, ())), [("ada",)])
+
+    def test_invalidation_is_seen_by_other_processes(self):
+        """An invalidation made by another process applies here immediately."""
+        cache = self.open_cache()
+        key = cache.key(DB, QUERY, ())
+        cache.set(key, [("ada",)])
+        self.in_other_process("cache.invalidate_tables(%r, ['users'])" % DB)
+        self.assertIsNone(cache.lookup(key))
+
+
+class TestTieredCache(DiskCacheTestCase):
+    """Test cases for a QueryCache stacked on a DiskCache."""
+
+    def open_tiers(self):
+        memory = QueryCache()
+        return memory, TieredCache(memory, self.open_cache())
+
+    def test_disk_hit_is_promoted_to_memory(self):
+        """A hit found only on disk is copied into the memory layer."""
+        memory, tiers = self.open_tiers()
+        key = tiers.key(DB, QUERY, ())
+        tiers.shared.set(key, [("ada",)])
+        self.assertEqual(tiers.get(key), [("ada",)])
+        self.assertIsNotNone(memory.lookup(key))
+
+    def test_memory_entry_checked_against_other_process_invalidation(self):
+        """Another process invalidating through the disk layer makes the memory copy miss too."""
+        memory, tiers = self.open_tiers()
+        key = tiers.key(DB, QUERY, ())
+        tiers.set(key, [("ada",)])
+        self.assertEqual(tiers.lookup(key), ([("ada",)], True))
+        self.in_other_process("cache.invalidate_tables(%r, ['users'])" % DB)
+        self.assertIsNotNone(memory.lookup(key))
+        self.assertIsNone(tiers.lookup(key))
+
+    def test_set_rejects_outdated_stamp(self):
+        """A result stored with an outdated stamp is never served, from either layer."""
+        _, tiers = self.open_tiers()
+        key = tiers.key(DB, QUERY, ())
+        stamp = tiers.stamp(key, ["users"])
+        tiers.shared.invalidate_tables(DB, ["users"])
+        tiers.set(key, [("stale",)], stamp=stamp)
+        self.assertIsNone(tiers.lookup(key))
+
+
+if __name__ == "__main__":
+    unittest.main()
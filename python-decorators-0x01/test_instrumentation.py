@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Unit tests for query instrumentation:
+- events reaching a handler through the queue with their fields
+- the default JSON-on-stderr setup when nothing is configured
+"""
+
+import io
+import json
+import logging
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+import instrumentation
+from instrumentation import configure_query_logging, instrument_queries, stop_query_logging
+
+
+class ListHandler(logging.Handler):
+    """Keeps the records it receives."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestQueryLogging(unittest.TestCase):
+    """Test cases for instrument_queries and the queue listener."""
+
+    def setUp(self):
+        stop_query_logging()
+        self.addCleanup(stop_query_logging)
+        self.conn = sqlite3.connect(":memory:")
+        self.addCleanup(self.conn.close)
+        self.conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        self.conn.execute("INSERT INTO users (name) VALUES ('ada')")
+
+    def fetch(self, **options):
+        @instrument_queries(query_position=1, **options)
+        def fetch(conn, query, params=()):
+            return conn.execute(query, params).fetchall()
+        return fetch
+
+    def test_record_reaches_handler_with_fields(self):
+        """The handler gets the record with the structured event attached."""
+        fetch = self.fetch(slow_ms=None)
+        handler = ListHandler()
+        configure_query_logging([handler])
+        fetch(self.conn, "SELECT * FROM users WHERE id = ?", (1,))
+        stop_query_logging()  # flushes the queue
+        self.assertEqual(len(handler.records), 1)
+        record = handler.records[0]
+        self.assertEqual(record.levelno, logging.INFO)
+        event = record.query_event
+        self.assertEqual(event["query"], "SELECT * FROM users WHERE id = ?")
+        self.assertEqual(event["params"], ["<int>"])
+        self.assertEqual(event["rows"], 1)
+        self.assertEqual(event["function"], fetch.__qualname__)
+        self.assertIn("test_instrumentation.py", event["caller"])
+        self.assertFalse(event["slow"])
+
+    def test_failure_is_logged_as_warning(self):
+        """A query that raises is logged at WARNING with the error."""
+        fetch = self.fetch(sample_rate=0.0)
+        handler = ListHandler()
+        configure_query_logging([handler])
+        with self.assertRaises(sqlite3.OperationalError):
+            fetch(self.conn, "SELECT * FROM missing")
+        stop_query_logging()
+        self.assertEqual([r.levelno for r in handler.records], [logging.WARNING])
+        self.assertIn("no such table", handler.records[0].query_event["error"])
+
+    def test_default_setup_writes_json_to_stderr(self):
+        """Without any configuration, events still come out as JSON lines on stderr."""
+        stderr = io.StringIO()
+        with patch("sys.stderr", stderr):
+            fetch = self.fetch()
+            self.assertTrue(any(isinstance(h, instrumentation._DroppingQueueHandler)
+                                for h in instrumentation.logger.handlers))
+            fetch(self.conn, "SELECT * FROM users")
+            stop_query_logging()
+        event = json.loads(stderr.getvalue())
+        self.assertEqual(event["level"], "INFO")
+        self.assertEqual(event["query"], "SELECT * FROM users")
+        self.assertEqual(event["rows"], 1)
+
+    def test_existing_handlers_are_left_alone(self):
+        """No default is installed over handlers the application attached itself."""
+        handler = ListHandler()
+        instrumentation.logger.addHandler(handler)
+        self.addCleanup(instrumentation.logger.removeHandler, handler)
+        fetch = self.fetch(slow_ms=0)  # WARNING, so the logger's level does not matter
+        self.assertEqual(instrumentation.logger.handlers, [handler])
+        fetch(self.conn, "SELECT * FROM users")
+        self.assertEqual(len(handler.records), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the in-memory query cache:
+- LRU eviction by entry count and by size
+- TTL expiry and the stale-while-revalidate window
+- invalidation by table, directly and through cache_query writes
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from query_cache import QueryCache, tables_in
+
+cache_query = __import__('4-cache_query').cache_query
+
+DB = "/data/users.db"
+
+
+def key(sql, params=()):
+    return QueryCache.key(DB, sql, params)
+
+
+class TestEviction(unittest.TestCase):
+    """Test cases for the LRU bound."""
+
+    def test_least_recently_used_goes_first(self):
+        """At capacity the entry read longest ago is evicted."""
+        cache = QueryCache(max_entries=3)
+        a, b, c, d = (key("SELECT * FROM users WHERE id = ?", (i,)) for i in range(4))
+        for k in (a, b, c):
+            cache.set(k, k[2])
+        cache.get(a)  # b is now the least recently used
+        cache.set(d, d[2])
+        self.assertNotIn(b, cache)
+        self.assertTrue(all(k in cache for k in (a, c, d)))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_overwrite_does_not_evict(self):
+        """Setting an existing key replaces it without counting as an eviction."""
+        cache = QueryCache(max_entries=2)
+        a, b = key("SELECT 1 FROM users"), key("SELECT 2 FROM users")
+        cache.set(a, 1)
+        cache.set(b, 2)
+        cache.set(a, 3)
+        self.assertEqual((cache.get(a), cache.get(b)), (3, 2))
+        self.assertEqual(cache.stats()["evictions"], 0)
+
+    def test_byte_bound(self):
+        """With max_bytes, old entries are evicted until the total fits; oversized values are skipped."""
+        cache = QueryCache(max_entries=None, max_bytes=10_000)
+        keys = [key("SELECT * FROM users WHERE id = ?", (i,)) for i in range(10)]
+        for k in keys:
+            cache.set(k, "x" * 3000)
+            self.assertLessEqual(cache.bytes, 10_000)
+        self.assertIn(keys[-1], cache)
+        self.assertNotIn(keys[0], cache)
+        cache.set(key("SELECT * FROM users"), "x" * 20_000)
+        self.assertNotIn(key("SELECT * FROM users"), cache)
+        self.assertIn(keys[-1], cache)
+
+
+@patch("query_cache.time.monotonic")
+class TestExpiry(unittest.TestCase):
+    """Test cases for TTL expiry, with the clock under test control."""
+
+    def test_expires_at_ttl(self, clock):
+        """An entry is fresh before its TTL and a miss from then on."""
+        clock.return_value = 100.0
+        cache = QueryCache(ttl=10)
+        k = key("SELECT * FROM users")
+        cache.set(k, "rows")
+        clock.return_value = 109.9
+        self.assertEqual(cache.lookup(k), ("rows", True))
+        clock.return_value = 110.0
+        self.assertIsNone(cache.lookup(k))
+        self.assertNotIn(k, cache)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_per_entry_ttl_overrides_default(self, clock):
+        """A `ttl` passed to set() wins over the cache's default."""
+        clock.return_value = 0.0
+        cache = QueryCache(ttl=10)
+        k = key("SELECT * FROM users")
+        cache.set(k, "rows", ttl=60)
+        clock.return_value = 30.0
+        self.assertEqual(cache.get(k), "rows")
+
+    def test_stale_window(self, clock):
+        """Past its TTL an entry is served stale, when asked, until `stale_for` runs out."""
+        clock.return_value = 0.0
+        cache = QueryCache()
+        k = key("SELECT * FROM users")
+        cache.set(k, "rows", ttl=5, stale_for=5)
+        clock.return_value = 7.0
+        self.assertIsNone(cache.lookup(k))
+        self.assertEqual(cache.lookup(k, allow_stale=True), ("rows", False))
+        clock.return_value = 10.0
+        self.assertIsNone(cache.lookup(k, allow_stale=True))
+        self.assertNotIn(k, cache)
+
+    def test_no_ttl_never_expires(self, clock):
+        """Without a TTL an entry stays fresh."""
+        clock.return_value = 0.0
+        cache = QueryCache()
+        k = key("SELECT * FROM users")
+        cache.set(k, "rows")
+        clock.return_value = 1e9
+        self.assertEqual(cache.lookup(k), ("rows", True))
+
+
+class TestInvalidation(unittest.TestCase):
+    """Test cases for invalidation by table."""
+
+    def test_only_entries_of_the_table_are_dropped(self):
+        """Invalidating a table drops the results that read it, in that database only."""
+        cache = QueryCache()
+        users = key("SELECT * FROM users")
+        joined = key("SELECT * FROM orders JOIN users ON users.id = orders.user_id")
+        orders = key("SELECT * FROM orders")
+        other_db = QueryCache.key("/data/other.db", "SELECT * FROM users", ())
+        for k in (users, joined, orders, other_db):
+            cache.set(k, k[1])
+        self.assertEqual(cache.invalidate_tables(DB, ["USERS"]), 2)
+        self.assertNotIn(users, cache)
+        self.assertNotIn(joined, cache)
+        self.assertIn(orders, cache)
+        self.assertIn(other_db, cache)
+        self.assertEqual(cache.stats()["invalidations"], 2)
+
+    def test_outdated_stamp_is_not_stored(self):
+        """A result computed before its table was invalidated is not cached."""
+        cache = QueryCache()
+        k = key("SELECT * FROM users")
+        stamp = cache.stamp(k)
+        cache.invalidate_tables(DB, ["users"])
+        cache.set(k, "old", stamp=stamp)
+        self.assertNotIn(k, cache)
+        cache.set(k, "new", stamp=cache.stamp(k))
+        self.assertEqual(cache.get(k), "new")
+
+    def test_tables_in(self):
+        """Table names are found after FROM, JOIN, UPDATE and INTO, lower-cased."""
+        self.assertEqual(tables_in("SELECT * FROM Users u JOIN orders o ON o.uid = u.id"), {"users", "orders"})
+        self.assertEqual(tables_in("UPDATE users SET name = ?"), {"users"})
+        self.assertEqual(tables_in("INSERT INTO audit (x) VALUES (1)"), {"audit"})
+
+
+class TestCacheQueryInvalidation(unittest.TestCase):
+    """cache_query drops cached reads when the decorated function writes to their table."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.conn = sqlite3.connect(os.path.join(tmp.name, "users.db"))
+        self.addCleanup(self.conn.close)
+        self.conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        self.conn.execute("INSERT INTO users (name) VALUES ('ada')")
+        self.conn.commit()
+
+    def test_write_invalidates_reads(self):
+        """An UPDATE through the decorated function makes the next SELECT run again."""
+        cache = QueryCache()
+
+        @cache_query(cache=cache)
+        def run(conn, query, params=()):
+            rows = conn.execute(query, params).fetchall()
+            conn.commit()
+            return rows
+
+        self.assertEqual(run(self.conn, "SELECT name FROM users"), [("ada",)])
+        self.assertEqual(run(self.conn, "SELECT name FROM users"), [("ada",)])
+        self.assertEqual(cache.stats()["hits"], 1)
+        run(self.conn, "UPDATE users SET name = ?", ("grace",))
+        self.assertEqual(run(self.conn, "SELECT name FROM users"), [("grace",)])
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
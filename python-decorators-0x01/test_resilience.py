@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Unit tests for retries and circuit breaking:
+- full_jitter bounds
+- transient vs permanent error classification
+- retry attempts, backoff and give-up conditions
+- CircuitBreaker closed/open/half-open transitions
+"""
+
+import asyncio
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+from resilience import CircuitBreaker, CircuitOpenError, full_jitter, is_retryable, retry
+
+LOCKED = sqlite3.OperationalError("database is locked")
+
+
+class Clock:
+    """A monotonic clock the test moves by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Flaky:
+    """Raises the queued errors one per call, then returns "ok"."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+        self.__qualname__ = "flaky"
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class TestFullJitter(unittest.TestCase):
+    """Test cases for full_jitter."""
+
+    def test_upper_bound_doubles_from_base_delay(self):
+        """After attempt n the wait is drawn from [0, base_delay * 2**(n - 1)], capped at max_delay."""
+        with patch("resilience.random.uniform", side_effect=lambda low, high: (low, high)):
+            bounds = [full_jitter(n, 0.1, 1.0) for n in range(1, 6)]
+        self.assertEqual([low for low, _ in bounds], [0] * 5)
+        for got, expected in zip([high for _, high in bounds], [0.1, 0.2, 0.4, 0.8, 1.0]):
+            self.assertAlmostEqual(got, expected)
+
+    def test_values_within_bounds(self):
+        for attempt in range(1, 8):
+            delay = full_jitter(attempt, 0.05, 0.5)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(0.5, 0.05 * 2 ** (attempt - 1)))
+
+
+class TestClassification(unittest.TestCase):
+    """Test cases for is_retryable."""
+
+    def test_transient(self):
+        for exc in (LOCKED, sqlite3.OperationalError("Database is BUSY"), TimeoutError(), ConnectionResetError()):
+            with self.subTest(exc=exc):
+                self.assertTrue(is_retryable(exc))
+
+    def test_permanent(self):
+        for exc in (sqlite3.OperationalError("no such table: users"), sqlite3.IntegrityError("UNIQUE"),
+                    ValueError("bad")):
+            with self.subTest(exc=exc):
+                self.assertFalse(is_retryable(exc))
+
+
+class TestRetry(unittest.TestCase):
+    """Test cases for the retry decorator, with sleeping recorded instead of done."""
+
+    def setUp(self):
+        self.sleeps = []
+
+    def wrap(self, func, **options):
+        return retry(func, sleep=self.sleeps.append, **options)
+
+    def test_transient_error_is_retried(self):
+        flaky = Flaky(LOCKED, LOCKED)
+        self.assertEqual(self.wrap(flaky, retries=3, base_delay=0.1)(), "ok")
+        self.assertEqual(flaky.calls, 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertLessEqual(self.sleeps[0], 0.1)
+        self.assertLessEqual(self.sleeps[1], 0.2)
+
+    def test_permanent_error_is_not_retried(self):
+        flaky = Flaky(sqlite3.OperationalError("no such table: users"))
+        wrapped = self.wrap(flaky, retries=5)
+        with self.assertRaises(sqlite3.OperationalError):
+            wrapped()
+        self.assertEqual(flaky.calls, 1)
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(wrapped.stats, {"calls": 1, "retries": 0, "gave_up": 0})
+
+    def test_gives_up_after_retries(self):
+        flaky = Flaky(*[LOCKED] * 5)
+        wrapped = self.wrap(flaky, retries=3)
+        with self.assertRaises(sqlite3.OperationalError):
+            wrapped()
+        self.assertEqual(flaky.calls, 3)
+        self.assertEqual(wrapped.stats, {"calls": 1, "retries": 2, "gave_up": 1})
+
+    def test_max_elapsed_budget(self):
+        """A retry whose wait would overrun `max_elapsed` is not attempted."""
+        flaky = Flaky(*[LOCKED] * 5)
+        with patch("resilience.full_jitter", return_value=1.0):
+            wrapped = self.wrap(flaky, retries=10, max_elapsed=0.5)
+            with self.assertRaises(sqlite3.OperationalError):
+                wrapped()
+        self.assertEqual(flaky.calls, 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_custom_retry_on(self):
+        flaky = Flaky(KeyError("k"))
+        self.assertEqual(self.wrap(flaky, retry_on=(KeyError,))(), "ok")
+        self.assertEqual(flaky.calls, 2)
+
+    def test_coroutine_function(self):
+        """Coroutine functions are retried with an awaited sleep."""
+        flaky = Flaky(LOCKED)
+        slept = []
+
+        async def sleep(delay):
+            slept.append(delay)
+
+        async def call():
+            return flaky()
+
+        wrapped = retry(call, retries=2, sleep=sleep)
+        self.assertEqual(asyncio.run(wrapped()), "ok")
+        self.assertEqual((flaky.calls, len(slept)), (2, 1))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for CircuitBreaker state transitions."""
+
+    def setUp(self):
+        self.clock = Clock()
+        self.breaker = CircuitBreaker("users.db", failure_threshold=3, reset_timeout=10, clock=self.clock)
+
+    def trip(self):
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+
+    def test_opens_after_threshold(self):
+        """Consecutive failures open the circuit; a success in between resets the count."""
+        b = self.breaker
+        b.record_failure()
+        b.record_failure()
+        b.record_success()
+        b.record_failure()
+        b.record_failure()
+        self.assertEqual(b.state, CircuitBreaker.CLOSED)
+        b.record_failure()
+        self.assertEqual(b.state, CircuitBreaker.OPEN)
+        self.assertFalse(b.allow())
+        self.assertEqual(b.stats()["rejected"], 1)
+
+    def test_half_open_lets_one_trial_through(self):
+        self.trip()
+        self.clock.now = 9.9
+        self.assertFalse(self.breaker.allow())
+        self.clock.now = 10.0
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())  # the trial is still running
+
+    def test_failed_trial_reopens(self):
+        self.trip()
+        self.clock.now = 10.0
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.clock.now = 19.9
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats()["opened"], 2)
+
+    def test_successful_trial_closes_and_records_recovery(self):
+        """Recovery time runs from the first opening to the close, across failed trials."""
+        self.trip()
+        self.clock.now = 10.0
+        self.breaker.allow()
+        self.breaker.record_failure()
+        self.clock.now = 20.0
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        stats = self.breaker.stats()
+        self.assertEqual(stats["state"], CircuitBreaker.CLOSED)
+        self.assertEqual(stats["last_recovery_s"], 20.0)
+        self.assertEqual(stats["total_open_s"], 20.0)
+        self.trip()
+        self.clock.now = 35.0
+        self.breaker.allow()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.stats()["last_recovery_s"], 15.0)
+        self.assertEqual(self.breaker.stats()["total_open_s"], 35.0)
+
+    def test_released_trial_allows_another(self):
+        """A trial that ends without a verdict (e.g. a bad query) frees the half-open slot."""
+        self.trip()
+        self.clock.now = 10.0
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+
+    def test_retry_fails_fast_when_open(self):
+        """retry() stops at the failure that opens the circuit and then rejects calls unattempted."""
+        flaky = Flaky(*[LOCKED] * 10)
+        sleeps = []
+        wrapped = retry(flaky, retries=10, breaker=self.breaker, sleep=sleeps.append)
+        with self.assertRaises(sqlite3.OperationalError):
+            wrapped()
+        self.assertEqual(flaky.calls, 3)
+        self.assertEqual(len(sleeps), 2)
+        with self.assertRaises(CircuitOpenError):
+            wrapped()
+        self.assertEqual(flaky.calls, 3)
+
+    def test_permanent_errors_do_not_trip(self):
+        flaky = Flaky(*[sqlite3.IntegrityError("UNIQUE")] * 5)
+        wrapped = retry(flaky, breaker=self.breaker, sleep=lambda _: None)
+        for _ in range(5):
+            with self.assertRaises(sqlite3.IntegrityError):
+                wrapped()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Unit tests for transaction handling:
+- transactional (commit, rollback, nested savepoints)
+- a connection that already holds an implicit transaction
+- write_batch
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from transactions import write_batch
+
+transactional = __import__('2-transactional').transactional
+
+INSERT = "INSERT INTO users (name) VALUES (?)"
+
+
+@transactional
+def add_user(conn, name, fail=False):
+    conn.execute(INSERT, (name,))
+    if fail:
+        raise ValueError(name)
+
+
+@transactional
+def add_pair(conn, first, second, fail_second=False):
+    add_user(conn, first)
+    try:
+        add_user(conn, second, fail=fail_second)
+    except ValueError:
+        pass
+
+
+@transactional(immediate=True)
+def add_pair_then_fail(conn, first, second):
+    add_user(conn, first)
+    add_user(conn, second)
+    raise RuntimeError("outer failure")
+
+
+class TestTransactional(unittest.TestCase):
+    """Test cases for the transactional decorator on sqlite3 connections."""
+
+    def setUp(self):
+        """Create a users table in a temporary database file."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "users.db")
+        self.conn = sqlite3.connect(self.path)
+        self.addCleanup(self.conn.close)
+        self.conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        self.conn.commit()
+
+    def committed_names(self):
+        """Names visible to another connection, i.e. committed ones."""
+        other = sqlite3.connect(self.path)
+        try:
+            return [name for (name,) in other.execute("SELECT name FROM users ORDER BY id")]
+        finally:
+            other.close()
+
+    def test_commits_on_return(self):
+        """The function's writes are committed when it returns."""
+        add_user(self.conn, "ada")
+        self.assertFalse(self.conn.in_transaction)
+        self.assertEqual(self.committed_names(), ["ada"])
+
+    def test_rolls_back_on_error(self):
+        """An exception undoes every write of the outer call, nested ones included."""
+        with self.assertRaises(RuntimeError):
+            add_pair_then_fail(self.conn, "ada", "alan")
+        self.assertFalse(self.conn.in_transaction)
+        self.assertEqual(self.committed_names(), [])
+
+    def test_nested_failure_rolls_back_savepoint_only(self):
+        """A failing nested call undoes only its own writes."""
+        add_pair(self.conn, "ada", "alan", fail_second=True)
+        self.assertFalse(self.conn.in_transaction)
+        self.assertEqual(self.committed_names(), ["ada"])
+
+    def test_nested_success_commits_once(self):
+        """Nested calls are released into the outer transaction and committed with it."""
+        add_pair(self.conn, "ada", "alan")
+        self.assertEqual(self.committed_names(), ["ada", "alan"])
+
+    def test_implicit_transaction_is_left_to_the_caller(self):
+        """Inside the caller's implicit transaction the call is a savepoint and does not commit."""
+        self.conn.execute(INSERT, ("grace",))  # sqlite3 opens a transaction before the INSERT
+        self.assertTrue(self.conn.in_transaction)
+        add_user(self.conn, "ada")
+        self.assertTrue(self.conn.in_transaction)
+        self.assertEqual(self.committed_names(), [])
+        self.conn.commit()
+        self.assertEqual(self.committed_names(), ["grace", "ada"])
+
+    def test_implicit_transaction_failure_keeps_callers_writes(self):
+        """A failing call rolls back to its savepoint, leaving the caller's pending writes."""
+        self.conn.execute(INSERT, ("grace",))
+        with self.assertRaises(ValueError):
+            add_user(self.conn, "ada", fail=True)
+        self.conn.commit()
+        self.assertEqual(self.committed_names(), ["grace"])
+
+
+class TestWriteBatch(unittest.TestCase):
+    """Test cases for write_batch."""
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.addCleanup(self.conn.close)
+        self.conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+        self.conn.commit()
+
+    def test_writes_every_row(self):
+        """All rows are written and committed, in chunks."""
+        written = write_batch(self.conn, INSERT, ((f"u{i}",) for i in range(25)), chunk_size=10)
+        self.assertEqual(written, 25)
+        self.assertFalse(self.conn.in_transaction)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0], 25)
+
+    def test_failed_chunk_keeps_earlier_chunks(self):
+        """Chunks committed before a failing one stay; the failing chunk is rolled back."""
+        rows = [("a",), ("b",), ("c",), ("a",)]
+        with self.assertRaises(sqlite3.IntegrityError):
+            write_batch(self.conn, INSERT, rows, chunk_size=2)
+        names = [n for (n,) in self.conn.execute("SELECT name FROM users ORDER BY id")]
+        self.assertEqual(names, ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Transaction boundaries for SQLite connections.
+
+`transaction(conn)` runs its block in one transaction: it commits when the
+block finishes and rolls back if it raises. If the connection is already
+inside a transaction, the block becomes a SAVEPOINT instead. A failing inner
+block then rolls back only its own writes and the outer transaction carries
+on.
+
+`immediate=True` starts the outermost transaction with BEGIN IMMEDIATE. That
+takes the write lock up front, so a read-then-write path cannot fail halfway
+with "database is locked" when another writer got there first.
+
+`write_batch` groups many writes into one commit. A commit costs a journal
+sync, so one commit per thousand rows beats one per row by orders of
+magnitude. `atransaction` is the aiosqlite counterpart of `transaction`.
+"""
+import contextlib
+import itertools
+from typing import Iterable, Iterator, Optional, Sequence
+
+_savepoint_ids = itertools.count(1)
+
+
+def _begin(immediate: bool) -> str:
+    return "BEGIN IMMEDIATE" if immediate else "BEGIN"
+
+
+@contextlib.contextmanager
+def transaction(conn, immediate: bool = False):
+    if conn.in_transaction:
+        name = f"sp_{next(_savepoint_ids)}"
+        conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            raise
+        conn.execute(f"RELEASE {name}")
+        return
+    conn.execute(_begin(immediate))
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+@contextlib.asynccontextmanager
+async def atransaction(conn, immediate: bool = False):
+    if conn.in_transaction:
+        name = f"sp_{next(_savepoint_ids)}"
+        await conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield conn
+        except BaseException:
+            await conn.execute(f"ROLLBACK TO {name}")
+            await conn.execute(f"RELEASE {name}")
+            raise
+        await conn.execute(f"RELEASE {name}")
+        return
+    await conn.execute(_begin(immediate))
+    try:
+        yield conn
+    except BaseException:
+        await conn.rollback()
+        raise
+    await conn.commit()
+
+
+def _chunks(rows: Iterable[Sequence], size: int) -> Iterator[list]:
+    it = iter(rows)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_batch(conn, sql: str, rows: Iterable[Sequence], chunk_size: Optional[int] = None,
+                immediate: bool = True) -> int:
+    """Run `sql` for every parameter tuple in `rows`, committing once per chunk.
+
+    With `chunk_size=None` everything goes into a single transaction. A
+    chunk size bounds how long the write lock is held and how large the
+    journal grows on very big loads. Returns the number of rows written. If a
+    chunk fails, the chunks already committed stay.
+    """
+    written = 0
+    for chunk in ([list(rows)] if chunk_size is None else _chunks(rows, chunk_size)):
+        with transaction(conn, immediate):
+            conn.executemany(sql, chunk)
+        written += len(chunk)
+    return written
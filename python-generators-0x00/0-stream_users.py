@@ -1,9 +1,12 @@
 from contextlib import contextmanager
 from typing import Generator, Tuple
 
-import mysql.connector
 from mysql.connector import MySQLConnection
 
+from pool import PooledConnection, get_pool
+
+Row = Tuple[str, str, str, int]
+
 
 @contextmanager
 def _cursor(conn: MySQLConnection):
@@ -14,21 +17,12 @@ def _cursor(conn: MySQLConnection):
         cur.close()
 
 
-def _get_connection() -> MySQLConnection:
-    """Assumes the database ALX_prodev already exists and credentials are in env vars."""
-    import os
-
-    cfg = {
-        "user": os.getenv("MYSQL_USER", "root"),
-        "password": os.getenv("MYSQL_PASSWORD", ""),
-        "host": os.getenv("MYSQL_HOST", "127.0.0.1"),
-        "port": int(os.getenv("MYSQL_PORT", 3306)),
-        "database": "ALX_prodev",
-    }
-    return mysql.connector.connect(**cfg)
+def _get_connection() -> PooledConnection:
+    """Lease a connection to ALX_prodev from the shared pool; `close()` returns it."""
+    return get_pool().acquire()
 
 
-def stream_users() -> Generator[Tuple[str, str, str, int], None, None]:
+def stream_users() -> Generator[Row, None, None]:
     """Yield rows from user_data table one at a time using a single loop."""
     conn = _get_connection()
     try:
@@ -39,3 +33,32 @@ def stream_users() -> Generator[Tuple[str, str, str, int], None, None]:
                 yield row
     finally:
         conn.close()
+
+
+def stream_users_unbuffered(prefetch: int = 500) -> Generator[Row, None, None]:
+    """Yield rows through an unbuffered cursor, holding at most `prefetch` rows client-side.
+
+    The server streams the result set and rows are pulled off the socket in
+    `fetchmany(prefetch)` slices, so peak memory is bounded by the read-ahead
+    buffer rather than by the size of user_data. Stopping early disconnects
+    the leased connection instead of draining the rest of the result set.
+    """
+    if prefetch < 1:
+        raise ValueError("prefetch must be at least 1")
+    conn = _get_connection()
+    exhausted = False
+    try:
+        cur = conn.cursor(buffered=False)
+        cur.execute("SELECT user_id, name, email, age FROM user_data")
+        while True:
+            rows = cur.fetchmany(prefetch)
+            if not rows:
+                exhausted = True
+                break
+            yield from rows
+        cur.close()
+    finally:
+        if exhausted:
+            conn.close()
+        else:
+            conn.discard()
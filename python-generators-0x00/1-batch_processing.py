@@ -1,40 +1,65 @@
-from typing import Generator, List, Tuple
-import mysql.connector
+import time
+from typing import Generator, Iterable, List, Optional, Sequence, Tuple
+
+from adaptive import BatchSizer, estimate_bytes
+from filters import Predicate, age_gt, compile_query
+from pool import get_pool
 
 Row = Tuple[str, str, str, int]
 
 
 def _get_connection():
-    import os
-    return mysql.connector.connect(
-        user=os.getenv("MYSQL_USER", "root"),
-        password=os.getenv("MYSQL_PASSWORD", ""),
-        host=os.getenv("MYSQL_HOST", "127.0.0.1"),
-        port=int(os.getenv("MYSQL_PORT", 3306)),
-        database="ALX_prodev",
-    )
-
-
-def stream_users_in_batches(batch_size: int = 100) -> Generator[List[Row], None, None]:
-    """Yield lists of `batch_size` rows from user_data using at most **two** loops."""
+    """Lease a connection from the shared pool; `close()` returns it."""
+    return get_pool().acquire()
+
+
+def stream_users_in_batches(
+    batch_size: int = 100,
+    columns: Optional[Sequence[str]] = None,
+    filters: Iterable[Predicate] = (),
+    sizer: Optional[BatchSizer] = None,
+) -> Generator[List[Row], None, None]:
+    """Yield lists of `batch_size` rows from user_data using at most **two** loops.
+
+    `columns` and `filters` are compiled into the SELECT list and WHERE clause
+    (see filters.py). Predicates that cannot be pushed down are applied to each
+    fetched batch, so such batches may come out shorter than `batch_size`.
+
+    With a `sizer` (see adaptive.py) `batch_size` is ignored: each fetch asks
+    the sizer how many rows to read and reports back how long the batch took,
+    including the time the consumer spent on it.
+    """
+    query = compile_query(columns, filters)
     conn = _get_connection()
     try:
         cur = conn.cursor()
-        cur.execute("SELECT user_id, name, email, age FROM user_data")
+        cur.execute(query.sql, query.params)
         while True:  # loop 1
-            batch = cur.fetchmany(batch_size)
-            if not batch:
+            started = time.perf_counter()
+            fetched = cur.fetchmany(sizer.next_size() if sizer else batch_size)
+            if not fetched:
                 break
-            yield batch  # no inner loop here, keeping loop count low
+            batch = query.apply(fetched) if query.needs_python else fetched
+            if batch:
+                yield batch  # no inner loop here, keeping loop count low
+            if sizer:
+                sizer.record(len(fetched), time.perf_counter() - started, estimate_bytes(fetched))
     finally:
         conn.close()
 
 
-def batch_processing(batch_size: int = 100) -> Generator[Row, None, None]:
+def batch_processing(
+    batch_size: int = 100,
+    filters: Optional[Iterable[Predicate]] = None,
+    columns: Optional[Sequence[str]] = None,
+    sizer: Optional[BatchSizer] = None,
+) -> Generator[Row, None, None]:
     """Stream batches, filter users with age > 25, and yield qualifying rows.
 
+    The age filter runs in the database; pass `filters`/`columns` to select a
+    different subset, and a `BatchSizer` to let the batch size adapt at runtime.
     Uses only **one** additional loop (total loops in file = 2)."""
-    for batch in stream_users_in_batches(batch_size):  # loop 2 (third overall if counting the while loop)
-        for row in batch:
-            if int(row[3]) > 25:
-                yield row
+    if filters is None:
+        filters = (age_gt(25),)
+    for batch in stream_users_in_batches(batch_size, columns, filters, sizer):  # loop 2
+        yield from batch
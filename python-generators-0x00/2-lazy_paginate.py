@@ -1,18 +1,13 @@
-from typing import Generator, List, Tuple
-import mysql.connector
+from typing import Generator, List, Optional, Tuple
+
+from pool import get_pool
 
 Row = Tuple[str, str, str, int]
 
 
 def _get_connection():
-    import os
-    return mysql.connector.connect(
-        user=os.getenv("MYSQL_USER", "root"),
-        password=os.getenv("MYSQL_PASSWORD", ""),
-        host=os.getenv("MYSQL_HOST", "127.0.0.1"),
-        port=int(os.getenv("MYSQL_PORT", 3306)),
-        database="ALX_prodev",
-    )
+    """Lease a connection from the shared pool; `close()` returns it."""
+    return get_pool().acquire()
 
 
 def paginate_users(page_size: int, offset: int = 0) -> List[Row]:
@@ -30,20 +25,54 @@ def paginate_users(page_size: int, offset: int = 0) -> List[Row]:
         conn.close()
 
 
-def lazy_paginate(page_size: int) -> Generator[List[Row], None, None]:
+def paginate_users_after(page_size: int, last_user_id: Optional[str] = None) -> List[Row]:
+    """Fetch the page of rows whose `user_id` sorts after `last_user_id` (keyset/seek).
+
+    The primary key index is used to seek straight to the first row of the page,
+    so the cost of a page does not depend on how deep into the table it is.
+    """
+    conn = _get_connection()
+    try:
+        cur = conn.cursor()
+        if last_user_id is None:
+            cur.execute(
+                "SELECT * FROM user_data ORDER BY user_id LIMIT %s",
+                (page_size,),
+            )
+        else:
+            cur.execute(
+                "SELECT * FROM user_data WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                (last_user_id, page_size),
+            )
+        return cur.fetchall()
+    finally:
+        conn.close()
+
+
+def lazy_paginate(page_size: int, mode: str = "offset") -> Generator[List[Row], None, None]:
     """Lazily yield pages of size `page_size`, fetching the next page only when needed.
 
+    `mode` selects how the next page is located:
+    * ``"offset"`` – LIMIT/OFFSET; every page rescans the rows before it.
+    * ``"keyset"`` – seek on the last `user_id` seen; constant cost per page.
+
     Fulfills constraints:
     * exactly ONE loop (the while below)
     * uses yield for lazy generation
     * relies on paginate_users which itself executes the SQL containing
       "SELECT * FROM user_data LIMIT"
     """
+    if mode not in ("offset", "keyset"):
+        raise ValueError(f"Unknown pagination mode: {mode!r}")
     offset = 0
+    last_user_id = None
     while True:  # single loop
-        page = paginate_users(page_size, offset)
+        if mode == "keyset":
+            page = paginate_users_after(page_size, last_user_id)
+        else:
+            page = paginate_users(page_size, offset)
         if not page:
             break
         yield page
         offset += page_size
-
+        last_user_id = page[-1][0]
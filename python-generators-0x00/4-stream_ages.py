@@ -1,4 +1,5 @@
 seed = __import__('seed')
+stats = __import__('stats')
 
 
 def stream_user_ages():
@@ -6,24 +7,34 @@ def stream_user_ages():
     Yields:
         int: Age of each user.
     """
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor()
-    cursor.execute("SELECT age FROM user_data") 
-    for row in cursor:
-        yield row[0] 
-    connection.close()
+    with seed.connect_to_prodev() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT age FROM user_data")
+        for row in cursor:
+            yield row[0]
 
 
-def calculate_average_age():
+def calculate_average_age(pushdown=False):
     """Calculates the average age using the generator and prints it.
+    Args:
+        pushdown (bool): let the database compute AVG(age) instead of
+            streaming every age into Python.
     Rturns:
         None
     """
-    total_age = 0
-    count = 0
-    for age in stream_user_ages(): 
-        total_age += age
-        count += 1
-    print(f"Average age of users: {total_age / count}")
+    if pushdown:
+        aggregate = stats.aggregate_ages()
+        count, average = aggregate["count"], aggregate["mean"]
+    else:
+        moments = stats.RunningStats()
+        for age in stream_user_ages():
+            moments.add(age)
+        count, average = moments.count, moments.mean
+    if count == 0:
+        print("No users found")
+        return
+    print(f"Average age of users: {average}")
 
-calculate_average_age()
+
+if __name__ == "__main__":
+    calculate_average_age()
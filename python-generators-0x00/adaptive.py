@@ -0,0 +1,98 @@
+"""Adaptive `fetchmany` sizing for batch streams.
+
+The best batch size depends on row width, network latency and how fast the
+consumer is, none of which are known up front. `BatchSizer` tunes it at
+runtime the way TCP tunes its congestion window:
+
+* slow start – the size doubles every batch until the first overshoot;
+* congestion avoidance – past `threshold` it grows additively;
+* on overshoot – a batch took longer than `target_latency` (fetch plus the
+  consumer's work on it) or exceeded `memory_budget` bytes – the size and
+  threshold are halved.
+
+    sizer = BatchSizer(target_latency=0.05)
+    for row in batch_processing(sizer=sizer):
+        ...
+    print(sizer.stats())
+"""
+import sys
+from typing import Dict, Optional, Sequence, Tuple
+
+
+def estimate_bytes(rows: Sequence[Tuple]) -> int:
+    """Rough in-memory size of a batch, extrapolated from its first row."""
+    if not rows:
+        return 0
+    first = rows[0]
+    per_row = sys.getsizeof(first) + sum(sys.getsizeof(v) for v in first)
+    return per_row * len(rows)
+
+
+class BatchSizer:
+    """AIMD controller for the number of rows requested per batch."""
+
+    def __init__(
+        self,
+        initial: int = 64,
+        min_size: int = 16,
+        max_size: int = 50_000,
+        target_latency: float = 0.05,
+        memory_budget: Optional[int] = None,
+        increment: Optional[int] = None,
+    ):
+        if not 1 <= min_size <= initial <= max_size:
+            raise ValueError("need 1 <= min_size <= initial <= max_size")
+        self.size = initial
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.memory_budget = memory_budget
+        self.increment = increment or min_size
+        self.threshold = max_size
+        self.batches = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.overshoots = 0
+        self.last_latency: Optional[float] = None
+        self.last_bytes: Optional[int] = None
+
+    def next_size(self) -> int:
+        return self.size
+
+    def record(self, rows: int, seconds: float, nbytes: Optional[int] = None) -> None:
+        """Feed back one batch: rows returned, wall time per batch and (optionally) its size in bytes."""
+        self.batches += 1
+        self.rows += rows
+        self.seconds += seconds
+        self.last_latency = seconds
+        self.last_bytes = nbytes
+
+        over_memory = self.memory_budget is not None and nbytes is not None and nbytes > self.memory_budget
+        if seconds > self.target_latency or over_memory:
+            self.overshoots += 1
+            self.threshold = max(self.min_size, self.size // 2)
+            self.size = self.threshold
+        elif rows < self.size:
+            return  # a short (final) batch says nothing about capacity
+        elif self.size < self.threshold:
+            self.size = min(self.size * 2, self.threshold, self.max_size)
+        else:
+            self.size = min(self.size + self.increment, self.max_size)
+
+        if self.memory_budget is not None and nbytes and rows:
+            per_row = nbytes / rows
+            self.size = max(self.min_size, min(self.size, int(self.memory_budget // per_row)))
+
+    def stats(self) -> Dict:
+        """What the controller settled on, for logs and dashboards."""
+        return {
+            "batch_size": self.size,
+            "threshold": self.threshold,
+            "batches": self.batches,
+            "rows": self.rows,
+            "overshoots": self.overshoots,
+            "mean_latency": self.seconds / self.batches if self.batches else None,
+            "last_latency": self.last_latency,
+            "last_bytes": self.last_bytes,
+            "rows_per_sec": self.rows / self.seconds if self.seconds else None,
+        }
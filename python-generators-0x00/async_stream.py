@@ -0,0 +1,139 @@
+"""Asyncio variants of the user_data generators.
+
+    async for row in astream_users():
+        ...
+
+mysql-connector is blocking, so each stream drives the existing synchronous
+generator on a small dedicated thread pool and hands results to the event
+loop through a bounded `asyncio.Queue`:
+
+* `prefetch` bounds how many batches/pages are read ahead; a slow consumer
+  stalls its producer instead of growing memory (backpressure).
+* At most `pool size` streams talk to the database at once. Extra consumers
+  wait on the event loop rather than parking threads on the connection pool,
+  so many of them can share one process without starving each other.
+* Breaking out of `async for` (or cancelling the task) stops the producer and
+  closes the underlying generator, which returns its pooled connection.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from typing import AsyncGenerator, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from filters import Predicate
+from pool import get_pool
+
+streams = __import__('0-stream_users')
+batches = __import__('1-batch_processing')
+paginate = __import__('2-lazy_paginate')
+
+Row = Tuple[str, str, str, int]
+
+_END = object()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def _db_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_pool().size, thread_name_prefix="user_data-io")
+        return _executor
+
+
+def _stream_slots(loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+    if loop not in _slots:
+        _slots[loop] = asyncio.Semaphore(get_pool().size)
+    return _slots[loop]
+
+
+async def _aiterate(make_iter: Callable[[], Iterator], prefetch: int) -> AsyncGenerator:
+    """Drive the blocking iterator from `make_iter` off-loop, `prefetch` items ahead."""
+    if prefetch < 1:
+        raise ValueError("prefetch must be at least 1")
+    loop = asyncio.get_running_loop()
+    executor = _db_executor()
+    async with _stream_slots(loop):
+        it = make_iter()
+        lock = threading.Lock()  # never step and close the generator concurrently
+
+        def step():
+            with lock:
+                return next(it, _END)
+
+        def close():
+            with lock:
+                it.close()
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+
+        async def produce():
+            try:
+                while True:
+                    item = await loop.run_in_executor(executor, step)
+                    await queue.put(item)
+                    if item is _END:
+                        return
+            except Exception as exc:
+                await queue.put(_Failure(exc))
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exc
+                yield item
+        finally:
+            producer.cancel()
+            with suppress(asyncio.CancelledError):
+                await producer
+            await loop.run_in_executor(executor, close)
+
+
+def _row_batches(batch_size: int) -> Iterator[List[Row]]:
+    """Group the unbuffered row stream so one executor hop carries a whole batch."""
+    batch = []
+    for row in streams.stream_users_unbuffered(batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def astream_users_in_batches(
+    batch_size: int = 100,
+    prefetch: int = 2,
+    columns: Optional[Sequence[str]] = None,
+    filters: Iterable[Predicate] = (),
+) -> AsyncGenerator[List[Row], None]:
+    """Async `stream_users_in_batches`; up to `prefetch` batches are read ahead."""
+    filters = tuple(filters)
+    async for batch in _aiterate(lambda: batches.stream_users_in_batches(batch_size, columns, filters), prefetch):
+        yield batch
+
+
+async def astream_users(batch_size: int = 500, prefetch: int = 2) -> AsyncGenerator[Row, None]:
+    """Async `stream_users`. Rows are fetched off-loop `batch_size` at a time."""
+    async for batch in _aiterate(lambda: _row_batches(batch_size), prefetch):
+        for row in batch:
+            yield row
+
+
+async def alazy_paginate(page_size: int, mode: str = "offset", prefetch: int = 1) -> AsyncGenerator[List[Row], None]:
+    """Async `lazy_paginate`; with `prefetch=1` the next page is fetched while this one is consumed."""
+    async for page in _aiterate(lambda: paginate.lazy_paginate(page_size, mode), prefetch):
+        yield page
@@ -0,0 +1,178 @@
+"""Database backends for the generators package.
+
+Everything in this package talks to a DB-API connection obtained through the
+shared pool (pool.py); the backend decides what that connection is:
+
+* `MySQLBackend` – mysql-connector against the ALX_prodev database (default).
+* `SQLiteBackend` – a local SQLite file with the same streaming, batching and
+  pagination semantics, for benchmarks and tests on one machine without a
+  MySQL server. Connections run in WAL mode with memory-mapped reads, and
+  statements written for MySQL (`%s` placeholders, `INSERT IGNORE`) are
+  translated on the fly.
+
+Pick one with PRODEV_BACKEND=mysql|sqlite (PRODEV_SQLITE_PATH sets the file)
+or programmatically with `use_backend("sqlite")`.
+"""
+import functools
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional, Sequence, Union
+
+import mysql.connector
+from mysql.connector import errors as mysql_errors
+
+
+def connection_config(database: Optional[str] = "ALX_prodev") -> Dict:
+    """Connection settings taken from the MYSQL_* environment variables (or defaults)."""
+    cfg = {
+        "user": os.getenv("MYSQL_USER", "root"),
+        "password": os.getenv("MYSQL_PASSWORD", ""),
+        "host": os.getenv("MYSQL_HOST", "127.0.0.1"),
+        "port": int(os.getenv("MYSQL_PORT", 3306)),
+    }
+    if database:
+        cfg["database"] = database
+    if os.getenv("MYSQL_ALLOW_LOCAL_INFILE") == "1":
+        cfg["allow_local_infile"] = True
+    return cfg
+
+
+class MySQLBackend:
+    name = "mysql"
+    transient_errors = (mysql_errors.OperationalError, mysql_errors.InterfaceError)
+
+    def connect(self):
+        return mysql.connector.connect(**connection_config())
+
+
+@functools.lru_cache(maxsize=256)
+def translate(sql: str) -> str:
+    """Rewrite the MySQL-flavoured statements used in this package for SQLite."""
+    return sql.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE")
+
+
+class SQLiteCursor:
+    """DB-API cursor that accepts the package's MySQL-style SQL.
+
+    SQLite cursors step through results lazily, so every cursor is already
+    "unbuffered"; the mysql-connector `buffered` flag is accepted and ignored.
+    """
+
+    def __init__(self, cur: sqlite3.Cursor):
+        self._cur = cur
+
+    def execute(self, sql: str, params: Sequence = ()):
+        self._cur.execute(translate(sql), params)
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        self._cur.executemany(translate(sql), seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchmany(self, size: int = 1):
+        return self._cur.fetchmany(size)
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self) -> None:
+        self._cur.close()
+
+
+class SQLiteConnection:
+    """The subset of the mysql-connector connection API the package relies on."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def cursor(self, buffered: Optional[bool] = None, **kwargs) -> SQLiteCursor:
+        return SQLiteCursor(self._conn.cursor())
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._conn.in_transaction
+
+    def is_connected(self) -> bool:
+        try:
+            self._conn.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class SQLiteBackend:
+    name = "sqlite"
+    transient_errors = (sqlite3.OperationalError,)
+
+    def __init__(self, path: Optional[str] = None, mmap_size: int = 256 << 20, busy_timeout_ms: int = 5000):
+        self.path = path or os.getenv("PRODEV_SQLITE_PATH", "ALX_prodev.sqlite3")
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.statements = 0
+        self._lock = threading.Lock()
+
+    def _count_statement(self, _sql: str) -> None:
+        with self._lock:
+            self.statements += 1
+
+    def connect(self) -> SQLiteConnection:
+        # check_same_thread=False: the pool hands connections to prefetch/async worker threads,
+        # one borrower at a time.
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.set_trace_callback(self._count_statement)
+        return SQLiteConnection(conn)
+
+
+Backend = Union[MySQLBackend, SQLiteBackend]
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend}
+
+_backend: Optional[Backend] = None
+
+
+def get_backend() -> Backend:
+    """The active backend, chosen by PRODEV_BACKEND (default: mysql)."""
+    global _backend
+    if _backend is None:
+        name = os.getenv("PRODEV_BACKEND", "mysql")
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown PRODEV_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+        _backend = BACKENDS[name]()
+    return _backend
+
+
+def use_backend(backend: Union[str, Backend]) -> Backend:
+    """Switch backend (by name or instance) and drop the pooled connections of the old one."""
+    global _backend
+    from pool import reset_pool
+
+    _backend = BACKENDS[backend]() if isinstance(backend, str) else backend
+    reset_pool()
+    return _backend
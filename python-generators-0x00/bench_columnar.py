@@ -0,0 +1,67 @@
+"""Tuple batches vs. columnar batches for a filter-and-aggregate job.
+
+Usage:
+    python bench_columnar.py --rows 1000000 --batch-size 10000
+
+The job counts users older than 25 and averages their age. The batches are
+fetched once and kept in memory, so the timings compare only the Python
+side: converting to columns (reported separately) and running the job.
+"""
+import argparse
+import time
+
+columnar = __import__('columnar')
+seed = __import__('seed')
+batches = __import__('1-batch_processing')
+
+
+def tuple_job(tuple_batches):
+    count = total = 0
+    for batch in tuple_batches:
+        for row in batch:
+            if row[3] > 25:
+                count += 1
+                total += row[3]
+    return count, total / count if count else None
+
+
+def columnar_job(column_batches):
+    count = total = 0
+    for batch in column_batches:
+        ages = batch["age"]
+        kept = ages[ages > 25]
+        count += len(kept)
+        total += int(kept.sum())
+    return count, total / count if count else None
+
+
+def _time(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    connection = seed.connect_to_prodev()
+    try:
+        seed.create_table(connection)
+        seed.ensure_rows(connection, args.rows)
+    finally:
+        connection.close()
+
+    tuples = list(batches.stream_users_in_batches(args.batch_size, filters=()))
+    cols, convert_t = _time(lambda: [columnar.ColumnBatch.from_rows(b, columnar.COLUMNS) for b in tuples])
+    (count_t, avg_t), tuple_t = _time(tuple_job, tuples)
+    (count_c, avg_c), col_t = _time(columnar_job, cols)
+    assert count_t == count_c
+
+    rows = sum(len(b) for b in tuples)
+    print(f"rows: {rows}, batch size: {args.batch_size}, matches: {count_t}, mean age: {avg_c:.2f}")
+    print(f"tuple batches    : {tuple_t:.3f}s ({rows / tuple_t:,.0f} rows/s)")
+    print(f"columnar batches : {col_t:.3f}s ({rows / col_t:,.0f} rows/s), "
+          f"+{convert_t:.3f}s one-off conversion")
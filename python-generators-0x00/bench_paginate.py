@@ -0,0 +1,78 @@
+"""Compare OFFSET and keyset pagination of user_data.
+
+Usage:
+    python bench_paginate.py --rows 1000000 --page-size 100
+
+The table is topped up with synthetic users until it holds at least `--rows`
+rows, then the latency of a single page is measured at increasing depths for
+both modes. Pass `--full-walk` to also time a complete walk of the table
+(slow for OFFSET on large tables – that is the point).
+"""
+import argparse
+import time
+
+import pool
+
+seed = __import__('seed')
+lazy = __import__('2-lazy_paginate')
+
+
+def _key_at(conn, offset: int):
+    """Return the user_id preceding row `offset` in key order (None for the first page)."""
+    if offset == 0:
+        return None
+    cur = conn.cursor()
+    cur.execute("SELECT user_id FROM user_data ORDER BY user_id LIMIT 1 OFFSET %s", (offset - 1,))
+    row = cur.fetchone()
+    cur.close()
+    return row[0]
+
+
+def _time(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def page_latencies(conn, total: int, page_size: int):
+    depth = page_size
+    while depth < total:
+        offset_t = _time(lazy.paginate_users, page_size, depth)
+        keyset_t = _time(lazy.paginate_users_after, page_size, _key_at(conn, depth))
+        yield depth // page_size, offset_t, keyset_t
+        depth *= 10
+
+
+def full_walk(page_size: int, mode: str):
+    start = time.perf_counter()
+    rows = sum(len(page) for page in lazy.lazy_paginate(page_size, mode=mode))
+    return rows, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--full-walk", action="store_true")
+    args = parser.parse_args()
+
+    connection = seed.connect_to_prodev()
+    try:
+        seed.create_table(connection)
+        total = seed.ensure_rows(connection, args.rows)
+        print(f"user_data rows: {total}, page size: {args.page_size}")
+        print(f"{'page':>10} {'offset ms':>12} {'keyset ms':>12}")
+        for page_no, offset_t, keyset_t in page_latencies(connection, total, args.page_size):
+            print(f"{page_no:>10} {offset_t * 1e3:>12.2f} {keyset_t * 1e3:>12.2f}")
+    finally:
+        connection.close()
+
+    if args.full_walk:
+        for mode in ("keyset", "offset"):
+            rows, elapsed = full_walk(args.page_size, mode)
+            print(f"{mode:>7} full walk: {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+    print(f"pool: {pool.get_pool().stats()}")
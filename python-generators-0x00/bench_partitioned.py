@@ -0,0 +1,44 @@
+"""Scaling of the partitioned scan with worker count.
+
+Usage:
+    python bench_partitioned.py --rows 1000000 --workers 1 2 4 8
+
+The sequential baseline is stream_users_in_batches on a single connection.
+"""
+import argparse
+import time
+
+from partitioned import scan_partitioned_batches
+
+seed = __import__('seed')
+batches = __import__('1-batch_processing')
+
+
+def _time(batch_iter):
+    start = time.perf_counter()
+    rows = sum(len(batch) for batch in batch_iter)
+    return rows, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--ordered", action="store_true")
+    args = parser.parse_args()
+
+    connection = seed.connect_to_prodev()
+    try:
+        seed.create_table(connection)
+        total = seed.ensure_rows(connection, args.rows)
+    finally:
+        connection.close()
+
+    rows, base = _time(batches.stream_users_in_batches(args.batch_size))
+    print(f"user_data rows: {total}, batch size: {args.batch_size}, ordered: {args.ordered}")
+    print(f"{'workers':>10} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+    print(f"{'sequential':>10} {base:>9.2f} {rows / base:>12,.0f} {1.0:>7.2f}x")
+    for n in args.workers:
+        rows, elapsed = _time(scan_partitioned_batches(n, args.batch_size, args.ordered))
+        print(f"{n:>10} {elapsed:>9.2f} {rows / elapsed:>12,.0f} {base / elapsed:>7.2f}x")
@@ -0,0 +1,54 @@
+"""Wall-clock saving of read-ahead at realistic round-trip times.
+
+Usage:
+    python bench_prefetch.py --pages 200 --work-ms 5 --rtt-ms 0.5 5 25 80
+    python bench_prefetch.py --db --page-size 1000 --work-ms 5
+
+The default mode simulates each page fetch as one round trip plus transfer
+time so different RTTs can be compared on one machine. `--db` walks the real
+user_data table with keyset pagination instead.
+"""
+import argparse
+import time
+
+from prefetch import lazy_paginate_ahead, prefetch
+
+paginate = __import__('2-lazy_paginate')
+
+
+def simulated_pages(pages: int, rtt: float, transfer: float):
+    for i in range(pages):
+        time.sleep(rtt + transfer)
+        yield [i]
+
+
+def consume(pages, work: float) -> float:
+    start = time.perf_counter()
+    for _ in pages:
+        time.sleep(work)  # stand-in for CPU/IO work done per page
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--work-ms", type=float, default=5.0)
+    parser.add_argument("--transfer-ms", type=float, default=1.0)
+    parser.add_argument("--rtt-ms", type=float, nargs="+", default=[0.5, 5.0, 25.0, 80.0])
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--db", action="store_true")
+    args = parser.parse_args()
+    work = args.work_ms / 1e3
+
+    print(f"{'rtt ms':>8} {'serial s':>9} {'prefetch s':>11} {'saved':>7}")
+    if args.db:
+        serial = consume(paginate.lazy_paginate(args.page_size, mode="keyset"), work)
+        ahead = consume(lazy_paginate_ahead(args.page_size, "keyset", args.depth), work)
+        print(f"{'db':>8} {serial:>9.2f} {ahead:>11.2f} {1 - ahead / serial:>7.0%}")
+    else:
+        for rtt_ms in args.rtt_ms:
+            rtt, transfer = rtt_ms / 1e3, args.transfer_ms / 1e3
+            serial = consume(simulated_pages(args.pages, rtt, transfer), work)
+            ahead = consume(prefetch(simulated_pages(args.pages, rtt, transfer), args.depth), work)
+            print(f"{rtt_ms:>8} {serial:>9.2f} {ahead:>11.2f} {1 - ahead / serial:>7.0%}")
@@ -0,0 +1,49 @@
+"""Throughput of Python-side filtering vs. push-down at varying selectivity.
+
+Usage:
+    python bench_pushdown.py --rows 1000000 --batch-size 1000
+
+Synthetic users have ages spread evenly over 18..97, so `age > t` keeps
+roughly (97 - t) / 80 of the table. Both strategies yield the same rows; the
+push-down one lets MySQL drop the rest before they are sent.
+"""
+import argparse
+import time
+
+from filters import age_gt, matches
+
+seed = __import__('seed')
+batches = __import__('1-batch_processing')
+
+THRESHOLDS = {"1%": 96, "10%": 89, "50%": 57, "100%": 17}
+
+
+def _run(batch_size: int, threshold: int, pushdown: bool):
+    if pushdown:
+        flt = age_gt(threshold)
+    else:
+        flt = matches("age", lambda age: int(age) > threshold)
+    start = time.perf_counter()
+    count = sum(1 for _ in batches.batch_processing(batch_size, filters=(flt,)))
+    return count, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    connection = seed.connect_to_prodev()
+    try:
+        seed.create_table(connection)
+        total = seed.ensure_rows(connection, args.rows)
+    finally:
+        connection.close()
+
+    print(f"user_data rows: {total}, batch size: {args.batch_size}")
+    print(f"{'selectivity':>11} {'rows':>9} {'python s':>9} {'pushdown s':>11} {'speedup':>8}")
+    for label, threshold in THRESHOLDS.items():
+        rows, py_t = _run(args.batch_size, threshold, pushdown=False)
+        _, db_t = _run(args.batch_size, threshold, pushdown=True)
+        print(f"{label:>11} {rows:>9} {py_t:>9.2f} {db_t:>11.2f} {py_t / db_t:>7.1f}x")
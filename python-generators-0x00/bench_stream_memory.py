@@ -0,0 +1,84 @@
+"""Measure peak RSS while streaming the whole of user_data.
+
+Usage:
+    python bench_stream_memory.py --rows 3000000 --prefetch 100 1000 10000
+
+Every strategy runs in a fresh interpreter so its peak RSS is not polluted by
+the previous one. A flat column for the unbuffered strategy across growing
+`--rows` values is what we are after; the buffered cursor is the baseline.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+seed = __import__('seed')
+streams = __import__('0-stream_users')
+
+
+def _buffered():
+    conn = streams._get_connection()
+    try:
+        cur = conn.cursor(buffered=True)
+        cur.execute("SELECT user_id, name, email, age FROM user_data")
+        for row in cur:
+            yield row
+        cur.close()
+    finally:
+        conn.close()
+
+
+def run(strategy: str, prefetch: int) -> dict:
+    if strategy == "buffered":
+        rows = _buffered()
+    elif strategy == "default":
+        rows = streams.stream_users()
+    else:
+        rows = streams.stream_users_unbuffered(prefetch)
+    start = time.perf_counter()
+    count = sum(1 for _ in rows)
+    elapsed = time.perf_counter() - start
+    return {
+        "strategy": strategy,
+        "prefetch": prefetch if strategy == "unbuffered" else None,
+        "rows": count,
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def _in_child(strategy: str, prefetch: int) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", strategy, "--prefetch", str(prefetch)],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--prefetch", type=int, nargs="+", default=[100, 1000, 10_000])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run(args.child, args.prefetch[0])))
+        sys.exit(0)
+
+    connection = seed.connect_to_prodev()
+    try:
+        seed.create_table(connection)
+        total = seed.ensure_rows(connection, args.rows)
+    finally:
+        connection.close()
+
+    print(f"user_data rows: {total}")
+    print(f"{'strategy':>12} {'prefetch':>9} {'rows':>10} {'seconds':>9} {'peak MB':>9}")
+    results = [_in_child("buffered", 0), _in_child("default", 0)]
+    results += [_in_child("unbuffered", p) for p in args.prefetch]
+    for r in results:
+        print(f"{r['strategy']:>12} {str(r['prefetch'] or '-'):>9} {r['rows']:>10} "
+              f"{r['seconds']:>9} {r['peak_rss_mb']:>9}")
@@ -0,0 +1,196 @@
+"""Benchmark harness for the generators package.
+
+Usage:
+    python benchmark.py --rows 100000 --output results.json
+    python benchmark.py --rows 100000 --compare results.json --threshold 0.10
+    python benchmark.py --only stream_users lazy_paginate_keyset
+
+user_data is topped up to `--rows` synthetic users, then every strategy runs
+in a fresh interpreter (so peak RSS is its own) and reports:
+
+* rows, seconds and rows/sec;
+* peak RSS of the process;
+* queries – the server's `Questions` counter delta;
+* round trips – queries plus connection handshakes made by the pool;
+* bytes sent by the server.
+
+The server counters are global, so run against a quiet local database. With
+PRODEV_BACKEND=sqlite no server is needed: queries are the statements traced
+in the benchmark process (worker processes of the partitioned scan are not
+included) and bytes sent is 0.
+
+Results are written as JSON together with the git commit they were taken at;
+`--compare` checks them against an earlier file and exits non-zero when
+throughput or memory regressed by more than `--threshold`.
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Iterable
+
+from adaptive import BatchSizer
+from backends import get_backend
+from filters import matches
+from partitioned import scan_partitioned_batches
+from pool import get_pool
+from prefetch import lazy_paginate_ahead
+from stats import aggregate_ages
+
+seed = __import__('seed')
+streams = __import__('0-stream_users')
+batches = __import__('1-batch_processing')
+paginate = __import__('2-lazy_paginate')
+ages = __import__('4-stream_ages')
+
+
+def _rows(it: Iterable) -> int:
+    return sum(1 for _ in it)
+
+
+def _batched(it: Iterable) -> int:
+    return sum(len(batch) for batch in it)
+
+
+STRATEGIES: Dict[str, Callable[[argparse.Namespace], int]] = {
+    "stream_users": lambda o: _rows(streams.stream_users()),
+    "stream_users_unbuffered": lambda o: _rows(streams.stream_users_unbuffered(o.batch_size)),
+    "stream_users_in_batches": lambda o: _batched(batches.stream_users_in_batches(o.batch_size)),
+    "batch_processing": lambda o: _rows(batches.batch_processing(o.batch_size)),
+    "batch_processing_python_filter": lambda o: _rows(
+        batches.batch_processing(o.batch_size, filters=(matches("age", lambda age: age > 25),))),
+    "batch_processing_adaptive": lambda o: _rows(batches.batch_processing(sizer=BatchSizer())),
+    "lazy_paginate_offset": lambda o: _batched(paginate.lazy_paginate(o.batch_size, mode="offset")),
+    "lazy_paginate_keyset": lambda o: _batched(paginate.lazy_paginate(o.batch_size, mode="keyset")),
+    "lazy_paginate_prefetch": lambda o: _batched(lazy_paginate_ahead(o.batch_size, "keyset", depth=2)),
+    "stream_user_ages": lambda o: _rows(ages.stream_user_ages()),
+    "aggregate_ages": lambda o: aggregate_ages()["count"],
+    "partitioned_scan": lambda o: _batched(scan_partitioned_batches(o.workers, o.batch_size)),
+}
+
+
+def _server_status(conn) -> Dict[str, int]:
+    if conn is None:  # SQLite: nothing on the wire, count statements client-side
+        return {"Questions": get_backend().statements, "Bytes_sent": 0}
+    cur = conn.cursor()
+    cur.execute("SHOW GLOBAL STATUS WHERE Variable_name IN ('Questions', 'Bytes_sent')")
+    status = {name: int(value) for name, value in cur.fetchall()}
+    cur.close()
+    return status
+
+
+def run_strategy(name: str, opts: argparse.Namespace) -> Dict:
+    """Run one strategy in this process and measure it."""
+    # outside the pool so it does not skew the handshake count
+    probe = seed.connect_db() if get_backend().name == "mysql" else None
+    try:
+        before = _server_status(probe)
+        start = time.perf_counter()
+        rows = STRATEGIES[name](opts)
+        elapsed = time.perf_counter() - start
+        after = _server_status(probe)
+    finally:
+        if probe is not None:
+            probe.close()
+    queries = after["Questions"] - before["Questions"] - (probe is not None)  # minus the second status probe
+    handshakes = get_pool().stats()["handshakes"]
+    return {
+        "strategy": name,
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "queries": queries,
+        "round_trips": queries + handshakes,
+        "handshakes": handshakes,
+        "bytes_sent": after["Bytes_sent"] - before["Bytes_sent"],
+    }
+
+
+def _run_in_child(name: str, opts: argparse.Namespace) -> Dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", name,
+         "--batch-size", str(opts.batch_size), "--workers", str(opts.workers)],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> list:
+    """Regressions of `current` against `baseline`, as human readable strings."""
+    old = {r["strategy"]: r for r in baseline["results"]}
+    problems = []
+    for r in current["results"]:
+        base = old.get(r["strategy"])
+        if not base:
+            continue
+        if base["rows_per_sec"] and r["rows_per_sec"] < base["rows_per_sec"] * (1 - threshold):
+            problems.append(f"{r['strategy']}: rows/sec {base['rows_per_sec']:,.0f} -> {r['rows_per_sec']:,.0f}")
+        if r["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+            problems.append(f"{r['strategy']}: peak RSS {base['peak_rss_mb']} -> {r['peak_rss_mb']} MB")
+        if r["queries"] > base["queries"] * (1 + threshold):
+            problems.append(f"{r['strategy']}: queries {base['queries']} -> {r['queries']}")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--only", nargs="+", choices=sorted(STRATEGIES), help="Run just these strategies")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Tolerated relative regression")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_strategy(args.child, args)))
+        sys.exit(0)
+
+    connection = seed.connect_to_prodev()
+    try:
+        seed.create_table(connection)
+        total = seed.ensure_rows(connection, args.rows)
+    finally:
+        connection.close()
+
+    results = []
+    print(f"{'strategy':>32} {'rows':>9} {'seconds':>9} {'rows/s':>11} {'RSS MB':>7} {'queries':>8} {'trips':>7}")
+    for name in args.only or STRATEGIES:
+        r = _run_in_child(name, args)
+        results.append(r)
+        print(f"{name:>32} {r['rows']:>9} {r['seconds']:>9.3f} {r['rows_per_sec'] or 0:>11,.0f} "
+              f"{r['peak_rss_mb']:>7} {r['queries']:>8} {r['round_trips']:>7}")
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "table_rows": total,
+        "batch_size": args.batch_size,
+        "workers": args.workers,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
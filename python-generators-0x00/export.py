@@ -0,0 +1,187 @@
+"""Streaming export of user_data to NDJSON, CSV or Parquet files.
+
+Usage:
+    python export.py users.ndjson.gz
+    python export.py users.csv.zst --format csv --compression zstd
+    python export.py users.parquet --format parquet --compression zstd --workers 4
+
+Rows flow batch by batch from `stream_users_in_batches` straight into a
+compressing writer, so memory stays constant whatever the table size. With
+`--workers N` the key space is partitioned (see partitioned.py) and every
+worker process writes its own `<name>.partNNN.<ext>` file.
+
+zstd needs the `zstandard` package and Parquet needs `pyarrow`; both are
+only imported when asked for.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from filters import COLUMNS
+from partitioned import key_ranges, stream_range
+
+batches = __import__('1-batch_processing')
+columnar = __import__('columnar')
+
+FORMATS = ("ndjson", "csv", "parquet")
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+
+def _open_compressed(path: str, compression: str):
+    """Binary write stream that compresses on the fly."""
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd compression needs zstandard (pip install zstandard)") from None
+        return zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+
+def _json_value(value):
+    # age comes back from MySQL as a DECIMAL(3,0)
+    return int(value) if isinstance(value, Decimal) else value
+
+
+def _write_text(batch_iter: Iterable[List[Tuple]], path: str, fmt: str,
+                compression: str, names: Sequence[str]) -> int:
+    rows = 0
+    with _open_compressed(path, compression) as raw, \
+            io.TextIOWrapper(raw, encoding="utf-8", newline="") as out:
+        if fmt == "csv":
+            writer = csv.writer(out, lineterminator="\n")
+            writer.writerow(names)
+        for batch in batch_iter:
+            if fmt == "csv":
+                writer.writerows(batch)
+            else:
+                out.write("".join(
+                    json.dumps(dict(zip(names, map(_json_value, row))), ensure_ascii=False) + "\n"
+                    for row in batch
+                ))
+            rows += len(batch)
+    return rows
+
+
+def _write_parquet(batch_iter: Iterable[List[Tuple]], path: str,
+                   compression: str, names: Sequence[str]) -> int:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow)") from None
+    rows = 0
+    writer = None
+    try:
+        for batch in batch_iter:
+            record_batch = columnar.to_record_batch(batch, names)
+            if writer is None:
+                writer = pq.ParquetWriter(path, record_batch.schema,
+                                          compression=None if compression == "none" else compression)
+            writer.write_batch(record_batch)
+            rows += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:  # empty table: still leave a valid file behind
+        pq.write_table(_empty_table(names), path)
+    return rows
+
+
+def _empty_table(names: Sequence[str]):
+    import pyarrow as pa
+    fields = [pa.field(n, pa.int16() if n in columnar.NUMERIC_COLUMNS else pa.string()) for n in names]
+    return pa.schema(fields).empty_table()
+
+
+def write_batches(batch_iter: Iterable[List[Tuple]], path: str, fmt: str = "ndjson",
+                  compression: str = "gzip", names: Sequence[str] = COLUMNS) -> Dict:
+    """Write row batches to `path`; returns rows, bytes on disk and throughput."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression!r}")
+    start = time.perf_counter()
+    if fmt == "parquet":
+        rows = _write_parquet(batch_iter, path, compression, names)
+    else:
+        rows = _write_text(batch_iter, path, fmt, compression, names)
+    return _report(rows, os.path.getsize(path), time.perf_counter() - start, [path])
+
+
+def _report(rows: int, nbytes: int, seconds: float, paths: List[str]) -> Dict:
+    return {
+        "rows": rows,
+        "bytes": nbytes,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else float("inf"),
+        "bytes_per_sec": nbytes / seconds if seconds else float("inf"),
+        "files": paths,
+    }
+
+
+def export(path: str, fmt: str = "ndjson", compression: str = "gzip", batch_size: int = 1000,
+           columns: Optional[Sequence[str]] = None, filters=()) -> Dict:
+    """Export user_data (optionally projected/filtered) to a single file."""
+    names = tuple(columns or COLUMNS)
+    return write_batches(batches.stream_users_in_batches(batch_size, names, filters),
+                         path, fmt, compression, names)
+
+
+def partition_path(path: str, index: int) -> str:
+    """users.ndjson.gz -> users.part003.ndjson.gz"""
+    head, tail = os.path.split(path)
+    stem, dot, exts = tail.partition(".")
+    return os.path.join(head, f"{stem}.part{index:03d}{dot}{exts}")
+
+
+def _export_range(index: int, key_range, path: str, fmt: str, compression: str, batch_size: int) -> Dict:
+    return write_batches(stream_range(*key_range, batch_size=batch_size),
+                         partition_path(path, index), fmt, compression)
+
+
+def export_partitioned(path: str, workers: int = 4, fmt: str = "ndjson", compression: str = "gzip",
+                       batch_size: int = 1000) -> Dict:
+    """Export with one writer process per key range, each to its own part file."""
+    start = time.perf_counter()
+    ranges = key_ranges(workers)
+    with ProcessPoolExecutor(workers) as pool:
+        task = partial(_export_range, path=path, fmt=fmt, compression=compression, batch_size=batch_size)
+        parts = list(pool.map(task, range(len(ranges)), ranges))
+    return _report(
+        sum(p["rows"] for p in parts),
+        sum(p["bytes"] for p in parts),
+        time.perf_counter() - start,
+        [f for p in parts for f in p["files"]],
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export user_data to a compressed file.")
+    parser.add_argument("path", help="Output file (or name pattern for --workers)")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="gzip")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1, help="Partitioned export with N writer processes")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        report = export_partitioned(args.path, args.workers, args.format, args.compression, args.batch_size)
+    else:
+        report = export(args.path, args.format, args.compression, args.batch_size)
+    for f in report["files"]:
+        print(f)
+    print(
+        f"Exported {report['rows']} rows, {report['bytes']:,} bytes in {report['seconds']:.2f}s "
+        f"({report['bytes_per_sec'] / 1e6:.1f} MB/s, {report['rows_per_sec']:,.0f} rows/s)"
+    )
@@ -0,0 +1,124 @@
+"""Predicate / projection push-down for queries against user_data.
+
+Filters built here compile to a parameterised WHERE clause so the database
+discards rows before they cross the wire. Predicates that SQL cannot express
+(`matches`) fall back to Python and are applied to each fetched row.
+
+    query = compile_query(columns=("name", "email"),
+                          filters=(age_between(25, 40), email_domain("example.com")))
+    cur.execute(query.sql, query.params)
+    rows = query.apply(cur.fetchmany(100))
+"""
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+COLUMNS = ("user_id", "name", "email", "age")
+
+
+class Predicate:
+    """A filter on user_data: pushed down when `sql` is set, else checked in Python."""
+
+    def __init__(
+        self,
+        sql: Optional[str] = None,
+        params: Sequence[Any] = (),
+        column: Optional[str] = None,
+        check: Optional[Callable[[Any], bool]] = None,
+    ):
+        if (sql is None) == (check is None):
+            raise ValueError("a predicate needs exactly one of `sql` or `check`")
+        if column is not None and column not in COLUMNS:
+            raise ValueError(f"unknown column {column!r}")
+        self.sql = sql
+        self.params = tuple(params)
+        self.column = column
+        self.check = check
+
+    @property
+    def pushed_down(self) -> bool:
+        return self.sql is not None
+
+    def __repr__(self):
+        if self.pushed_down:
+            return f"Predicate({self.sql!r}, {self.params!r})"
+        return f"Predicate(python on {self.column!r})"
+
+
+def age_gt(age: int) -> Predicate:
+    return Predicate("age > %s", (age,))
+
+
+def age_between(low: int, high: int) -> Predicate:
+    """Inclusive age range."""
+    return Predicate("age BETWEEN %s AND %s", (low, high))
+
+
+def email_domain(domain: str) -> Predicate:
+    # "!" rather than backslash: the one escape character both MySQL and SQLite read the same way.
+    escaped = domain.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return Predicate("email LIKE %s ESCAPE '!'", (f"%@{escaped}",))
+
+
+def matches(column: str, check: Callable[[Any], bool]) -> Predicate:
+    """Python-side fallback for conditions SQL cannot express: `check(row[column])`."""
+    return Predicate(column=column, check=check)
+
+
+class CompiledQuery:
+    """SQL, bind parameters and the Python residual for one filtered projection."""
+
+    def __init__(self, sql: str, params: Tuple, fetched: Sequence[str],
+                 columns: Sequence[str], residual: Sequence[Predicate]):
+        self.sql = sql
+        self.params = params
+        self.fetched = tuple(fetched)
+        self.columns = tuple(columns)
+        self._checks = [(self.fetched.index(p.column), p.check) for p in residual]
+        # Residual predicates may need columns the caller did not ask for.
+        self._project = None
+        if self.fetched != self.columns:
+            self._project = [self.fetched.index(c) for c in self.columns]
+
+    @property
+    def needs_python(self) -> bool:
+        return bool(self._checks or self._project)
+
+    def apply(self, rows: Iterable[Tuple]) -> List[Tuple]:
+        """Run the residual predicates and projection over fetched rows."""
+        checks, project = self._checks, self._project
+        if checks:
+            rows = [r for r in rows if all(check(r[i]) for i, check in checks)]
+        if project:
+            return [tuple(r[i] for i in project) for r in rows]
+        return list(rows)
+
+
+def compile_where(filters: Iterable[Predicate]) -> Tuple[str, Tuple, List[Predicate]]:
+    """Split `filters` into a WHERE clause (with its params) and the Python-only residual."""
+    filters = list(filters)
+    pushed = [p for p in filters if p.pushed_down]
+    residual = [p for p in filters if not p.pushed_down]
+    if not pushed:
+        return "", (), residual
+    where = " WHERE " + " AND ".join(f"({p.sql})" for p in pushed)
+    return where, tuple(v for p in pushed for v in p.params), residual
+
+
+def compile_query(
+    columns: Optional[Sequence[str]] = None,
+    filters: Iterable[Predicate] = (),
+    table: str = "user_data",
+) -> CompiledQuery:
+    """Build the SELECT for `columns` (default: all) with `filters` pushed down where possible."""
+    columns = tuple(columns or COLUMNS)
+    unknown = [c for c in columns if c not in COLUMNS]
+    if unknown:
+        raise ValueError(f"unknown column(s): {', '.join(unknown)}")
+
+    where, params, residual = compile_where(filters)
+    fetched = list(columns)
+    for p in residual:
+        if p.column not in fetched:
+            fetched.append(p.column)
+
+    sql = f"SELECT {', '.join(fetched)} FROM {table}{where}"
+    return CompiledQuery(sql, params, fetched, columns, residual)
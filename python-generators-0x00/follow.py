@@ -0,0 +1,217 @@
+"""Change-feed streaming of new and updated user_data rows.
+
+Instead of rescanning the table, `follow` yields only the rows inserted or
+updated after a watermark, so a consumer's work is O(changes). Two sources:
+
+* ``"changelog"`` – AFTER INSERT/UPDATE triggers append the user_id to
+  `user_data_changes`, whose auto-increment `seq` is the watermark.
+* ``"column"`` – an indexed `updated_at` per user, kept by triggers in the
+  `user_data_updates` side table (user_data itself is not altered); the
+  watermark is the `(updated_at, user_id)` pair of the last row seen.
+
+Run `enable_change_tracking(conn, mode)` once to install the tables,
+triggers and index. Then:
+
+    for watermark, row in follow("changelog", checkpoint=FileCheckpoint("feed.ckpt")):
+        handle(row)
+
+When there is nothing new the feed polls again after `poll_interval`
+seconds, doubling the wait up to `max_interval` until changes show up.
+Deletes are not part of the feed. A change committed by a transaction that
+began before an already-visible later one can carry a smaller watermark and
+be missed, so keep writer transactions short.
+"""
+import json
+import time
+from typing import Generator, List, Optional, Tuple, Union
+
+from backends import get_backend
+from pool import get_pool
+
+Row = Tuple[str, str, str, int]
+Watermark = Union[int, Tuple[str, str]]
+
+_CHANGELOG_DDL = {
+    "mysql": [
+        "CREATE TABLE IF NOT EXISTS user_data_changes ("
+        "  seq BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,"
+        "  user_id CHAR(36) NOT NULL,"
+        "  changed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)"
+        ") ENGINE=InnoDB",
+        "CREATE TRIGGER IF NOT EXISTS user_data_log_insert AFTER INSERT ON user_data FOR EACH ROW "
+        "INSERT INTO user_data_changes (user_id) VALUES (NEW.user_id)",
+        "CREATE TRIGGER IF NOT EXISTS user_data_log_update AFTER UPDATE ON user_data FOR EACH ROW "
+        "INSERT INTO user_data_changes (user_id) VALUES (NEW.user_id)",
+    ],
+    "sqlite": [
+        "CREATE TABLE IF NOT EXISTS user_data_changes ("
+        "  seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "  user_id TEXT NOT NULL,"
+        "  changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))"
+        ")",
+        "CREATE TRIGGER IF NOT EXISTS user_data_log_insert AFTER INSERT ON user_data "
+        "BEGIN INSERT INTO user_data_changes (user_id) VALUES (NEW.user_id); END",
+        "CREATE TRIGGER IF NOT EXISTS user_data_log_update AFTER UPDATE ON user_data "
+        "BEGIN INSERT INTO user_data_changes (user_id) VALUES (NEW.user_id); END",
+    ],
+}
+
+# The timestamp lives in a side table rather than in user_data, so the shape of
+# user_data (SELECT * rows, positional INSERTs) does not depend on the mode.
+_COLUMN_DDL = {
+    "mysql": [
+        "CREATE TABLE IF NOT EXISTS user_data_updates ("
+        "  user_id CHAR(36) NOT NULL PRIMARY KEY,"
+        "  updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),"
+        "  INDEX idx_user_data_updated (updated_at, user_id)"
+        ") ENGINE=InnoDB",
+        "INSERT IGNORE INTO user_data_updates (user_id, updated_at) "
+        "SELECT user_id, '1970-01-01 00:00:01' FROM user_data",
+        "CREATE TRIGGER IF NOT EXISTS user_data_stamp_insert AFTER INSERT ON user_data FOR EACH ROW "
+        "INSERT INTO user_data_updates (user_id) VALUES (NEW.user_id) "
+        "ON DUPLICATE KEY UPDATE updated_at = CURRENT_TIMESTAMP(6)",
+        "CREATE TRIGGER IF NOT EXISTS user_data_stamp_update AFTER UPDATE ON user_data FOR EACH ROW "
+        "INSERT INTO user_data_updates (user_id) VALUES (NEW.user_id) "
+        "ON DUPLICATE KEY UPDATE updated_at = CURRENT_TIMESTAMP(6)",
+    ],
+    "sqlite": [
+        "CREATE TABLE IF NOT EXISTS user_data_updates ("
+        "  user_id TEXT NOT NULL PRIMARY KEY,"
+        "  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))"
+        ") WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS idx_user_data_updated ON user_data_updates (updated_at, user_id)",
+        "INSERT OR IGNORE INTO user_data_updates (user_id, updated_at) "
+        "SELECT user_id, '1970-01-01 00:00:00.000' FROM user_data",
+        "CREATE TRIGGER IF NOT EXISTS user_data_stamp_insert AFTER INSERT ON user_data BEGIN "
+        "INSERT INTO user_data_updates (user_id) VALUES (NEW.user_id) "
+        "ON CONFLICT (user_id) DO UPDATE SET updated_at = excluded.updated_at; END",
+        "CREATE TRIGGER IF NOT EXISTS user_data_stamp_update AFTER UPDATE ON user_data BEGIN "
+        "INSERT INTO user_data_updates (user_id) VALUES (NEW.user_id) "
+        "ON CONFLICT (user_id) DO UPDATE SET updated_at = excluded.updated_at; END",
+    ],
+}
+
+
+def enable_change_tracking(conn, mode: str = "changelog") -> None:
+    """Install the changelog table and triggers, or the `user_data_updates` table, index and triggers."""
+    backend = get_backend().name
+    cur = conn.cursor()
+    try:
+        if mode == "changelog":
+            statements = _CHANGELOG_DDL[backend]
+        elif mode == "column":
+            statements = _COLUMN_DDL[backend]
+        else:
+            raise ValueError(f"Unknown change tracking mode: {mode!r}")
+        for sql in statements:
+            cur.execute(sql)
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def prune_changelog(conn, up_to_seq: int) -> int:
+    """Delete changelog entries every consumer has processed; returns rows removed."""
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM user_data_changes WHERE seq <= %s", (up_to_seq,))
+        conn.commit()
+        return cur.rowcount
+    finally:
+        cur.close()
+
+
+def _current_watermark(cur, mode: str) -> Watermark:
+    if mode == "changelog":
+        cur.execute("SELECT COALESCE(MAX(seq), 0) FROM user_data_changes")
+        return cur.fetchone()[0]
+    cur.execute("SELECT updated_at, user_id FROM user_data_updates ORDER BY updated_at DESC, user_id DESC LIMIT 1")
+    row = cur.fetchone()
+    return (str(row[0]), row[1]) if row else ("", "")
+
+
+def _changes_since(cur, mode: str, since: Watermark, limit: int) -> List[Tuple[Watermark, Row]]:
+    if mode == "changelog":
+        cur.execute(
+            "SELECT c.seq, u.user_id, u.name, u.email, u.age "
+            "FROM user_data_changes c JOIN user_data u ON u.user_id = c.user_id "
+            "WHERE c.seq > %s ORDER BY c.seq LIMIT %s",
+            (since, limit),
+        )
+        return [(r[0], r[1:]) for r in cur.fetchall()]
+    ts, key = since
+    cur.execute(
+        "SELECT t.updated_at, u.user_id, u.name, u.email, u.age "
+        "FROM user_data_updates t JOIN user_data u ON u.user_id = t.user_id "
+        "WHERE t.updated_at > %s OR (t.updated_at = %s AND t.user_id > %s) "
+        "ORDER BY t.updated_at, t.user_id LIMIT %s",
+        (ts, ts, key, limit),
+    )
+    return [((str(r[0]), r[1]), r[1:]) for r in cur.fetchall()]
+
+
+def _dump_watermark(watermark: Watermark) -> str:
+    """Watermark as a JSON string, which every checkpoint store keeps as-is."""
+    return json.dumps(watermark)
+
+
+def _load_watermark(mode: str, saved) -> Watermark:
+    value = json.loads(saved) if isinstance(saved, str) else saved  # older files kept the raw value
+    return int(value) if mode == "changelog" else tuple(value)
+
+
+def _dedupe(changes: List[Tuple[Watermark, Row]]) -> List[Tuple[Watermark, Row]]:
+    """Keep only the latest entry per user within a batch (a row updated twice is sent once)."""
+    latest = {row[0]: i for i, (_, row) in enumerate(changes)}
+    return [changes[i] for i in sorted(latest.values())]
+
+
+def follow(
+    mode: str = "changelog",
+    since: Optional[Watermark] = None,
+    batch_size: int = 500,
+    poll_interval: float = 0.5,
+    max_interval: float = 10.0,
+    idle_timeout: Optional[float] = None,
+    checkpoint=None,
+) -> Generator[Tuple[Watermark, Row], None, None]:
+    """Yield `(watermark, row)` for every row inserted or updated after `since`.
+
+    `since=None` starts at the current end of the feed (like `tail -f`); pass
+    0 (changelog) or ("", "") (column) to replay from the beginning. With a
+    `checkpoint` (see checkpoint.py) the watermark is loaded from and saved
+    to it after each batch. The feed ends after `idle_timeout` seconds
+    without changes; by default it runs until the consumer stops.
+    """
+    if mode not in ("changelog", "column"):
+        raise ValueError(f"Unknown change feed mode: {mode!r}")
+    if checkpoint is not None and since is None:
+        saved = checkpoint.load()
+        since = None if saved is None else _load_watermark(mode, saved)
+    if since is None:
+        with get_pool().lease() as conn:
+            cur = conn.cursor()
+            since = _current_watermark(cur, mode)
+            cur.close()
+
+    interval = poll_interval
+    idle_since = time.monotonic()
+    while True:
+        with get_pool().lease() as conn:
+            cur = conn.cursor()
+            changes = _changes_since(cur, mode, since, batch_size)
+            cur.close()
+        if changes:
+            since = changes[-1][0]
+            if mode == "changelog":
+                changes = _dedupe(changes)
+            yield from changes
+            if checkpoint is not None:
+                checkpoint.save(_dump_watermark(since))
+            interval = poll_interval
+            idle_since = time.monotonic()
+            continue
+        if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+            return
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
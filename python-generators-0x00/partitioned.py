@@ -0,0 +1,147 @@
+"""Parallel range-partitioned scan of user_data.
+
+The primary-key space is cut into N contiguous ranges and each range is
+streamed by its own worker process over its own connection. Batches come back
+through bounded queues, so a slow consumer applies backpressure to the
+workers instead of buffering the table in memory.
+
+    for row in scan_partitioned(workers=4):             # any order, fastest
+        ...
+    for row in scan_partitioned(workers=4, ordered=True):  # user_id order
+        ...
+
+`user_id` holds UUID4 strings, whose leading hex digits are uniformly
+distributed, so splitting the 32-bit prefix space evenly gives evenly sized
+partitions. Pass explicit `ranges` for keys that are not uniform.
+"""
+import multiprocessing as mp
+import queue
+from typing import Generator, List, Optional, Sequence, Tuple
+
+from pool import get_pool
+
+Row = Tuple[str, str, str, int]
+KeyRange = Tuple[Optional[str], Optional[str]]
+
+
+class PartitionError(RuntimeError):
+    """A worker failed while scanning its key range."""
+
+
+def key_ranges(partitions: int) -> List[KeyRange]:
+    """Split the UUID key space into `partitions` half-open `[lower, upper)` ranges.
+
+    The first range has no lower bound and the last no upper bound, so every
+    key – UUID or not – falls into exactly one range.
+    """
+    if partitions < 1:
+        raise ValueError("need at least one partition")
+    bounds = [format(i * 2 ** 32 // partitions, "08x") for i in range(1, partitions)]
+    lowers = [None] + bounds
+    uppers = bounds + [None]
+    return list(zip(lowers, uppers))
+
+
+def range_clause(lower: Optional[str], upper: Optional[str]) -> Tuple[str, Tuple]:
+    """WHERE clause (and params) selecting `lower <= user_id < upper`."""
+    conds, params = [], []
+    if lower is not None:
+        conds.append("user_id >= %s")
+        params.append(lower)
+    if upper is not None:
+        conds.append("user_id < %s")
+        params.append(upper)
+    if not conds:
+        return "", ()
+    return " WHERE " + " AND ".join(conds), tuple(params)
+
+
+def stream_range(lower: Optional[str], upper: Optional[str],
+                 batch_size: int = 1000) -> Generator[List[Row], None, None]:
+    """Yield batches of rows in `[lower, upper)` in user_id order on one pooled connection."""
+    where, params = range_clause(lower, upper)
+    with get_pool().lease() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT user_id, name, email, age FROM user_data{where} ORDER BY user_id", params)
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            yield batch
+        cur.close()
+
+
+def _scan_worker(index: int, key_range: KeyRange, batch_size: int, out) -> None:
+    try:
+        for batch in stream_range(*key_range, batch_size=batch_size):
+            out.put((index, batch))
+        out.put((index, None))
+    except Exception as exc:
+        out.put((index, PartitionError(f"partition {index} {key_range}: {exc!r}")))
+
+
+def _next_item(q, procs: Sequence[mp.Process]):
+    """Block on `q`, but notice workers that died without reporting back."""
+    while True:
+        try:
+            return q.get(timeout=1.0)
+        except queue.Empty:
+            dead = [p for p in procs if p.exitcode not in (None, 0)]
+            if dead:
+                raise PartitionError(f"worker {dead[0].name} exited with code {dead[0].exitcode}")
+
+
+def scan_partitioned_batches(
+    workers: int = 4,
+    batch_size: int = 1000,
+    ordered: bool = False,
+    queue_depth: int = 4,
+    ranges: Optional[Sequence[KeyRange]] = None,
+) -> Generator[List[Row], None, None]:
+    """Yield batches from one worker process per key range.
+
+    With `ordered=True` partitions are drained one after another, giving
+    global user_id order; later workers run ahead until their own queue of
+    `queue_depth` batches fills. Otherwise batches are yielded as they arrive.
+    Stopping early terminates the workers.
+    """
+    ranges = list(ranges) if ranges is not None else key_ranges(workers)
+    ctx = mp.get_context()
+    if ordered:
+        queues = [ctx.Queue(queue_depth) for _ in ranges]
+    else:
+        shared = ctx.Queue(queue_depth * len(ranges))
+        queues = [shared] * len(ranges)
+    procs = [
+        ctx.Process(target=_scan_worker, args=(i, rng, batch_size, queues[i]),
+                    name=f"user_data-scan-{i}", daemon=True)
+        for i, rng in enumerate(ranges)
+    ]
+    for p in procs:
+        p.start()
+    try:
+        pending = len(procs)
+        current = 0
+        while pending:
+            _, item = _next_item(queues[current], procs)
+            if isinstance(item, Exception):
+                raise item
+            if item is None:
+                pending -= 1
+                if ordered:
+                    current += 1
+                continue
+            yield item
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+        for p in procs:
+            p.join()
+
+
+def scan_partitioned(workers: int = 4, batch_size: int = 1000, ordered: bool = False,
+                     **kwargs) -> Generator[Row, None, None]:
+    """Row-at-a-time view over `scan_partitioned_batches`."""
+    for batch in scan_partitioned_batches(workers, batch_size, ordered, **kwargs):
+        yield from batch
@@ -0,0 +1,208 @@
+"""Shared connection pool for the generators package.
+
+Every module used to open (and tear down) a brand new connection per call,
+paying a TCP + auth handshake each time. The pool keeps a bounded set of
+connections alive and hands them out as leases; closing a leased connection
+returns it to the pool instead of disconnecting. Connections come from the
+active backend (see backends.py).
+
+    from pool import get_pool
+
+    with get_pool().lease() as conn:
+        cur = conn.cursor()
+        ...
+
+    print(get_pool().stats())  # {'handshakes': 1, 'leases': 10000, ...}
+"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from mysql.connector import MySQLConnection
+
+from backends import get_backend
+
+
+class PoolExhausted(RuntimeError):
+    """Raised when no connection could be leased within the pool timeout."""
+
+
+class PooledConnection:
+    """Proxy around a pooled connection; `close()` hands it back to the pool."""
+
+    def __init__(self, pool: "ConnectionPool", conn: MySQLConnection):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise AttributeError(f"connection already returned to pool ({name})")
+        return getattr(self._conn, name)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool._release(conn)
+
+    def discard(self) -> None:
+        """Disconnect instead of returning to the pool (e.g. mid-way through a streamed result)."""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool._release(conn, reuse=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Bounded pool of live connections.
+
+    * `size` caps the number of connections leased at the same time; extra
+      callers block for up to `timeout` seconds (forever when None).
+    * With `health_check` enabled an idle connection is pinged before it is
+      handed out and transparently replaced when the server dropped it.
+    * `handshakes` counts real connects, so the saving over one connection
+      per call can be measured.
+    """
+
+    def __init__(
+        self,
+        size: int = 5,
+        connect: Optional[Callable[[], MySQLConnection]] = None,
+        health_check: bool = True,
+        timeout: Optional[float] = None,
+    ):
+        if size < 1:
+            raise ValueError("pool size must be at least 1")
+        self.size = size
+        self.health_check = health_check
+        self.timeout = timeout
+        self._connect = connect or get_backend().connect
+        self._idle: List[MySQLConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self.handshakes = 0
+        self.leases = 0
+        self.reuses = 0
+        self.health_failures = 0
+
+    def _new_connection(self) -> MySQLConnection:
+        conn = self._connect()
+        with self._lock:
+            self.handshakes += 1
+        return conn
+
+    def _is_healthy(self, conn: MySQLConnection) -> bool:
+        try:
+            return conn.is_connected()
+        except Exception:
+            return False
+
+    def acquire(self) -> PooledConnection:
+        """Lease a connection; call `close()` on it (or use `lease()`) to give it back."""
+        if not self._slots.acquire(timeout=self.timeout if self.timeout is not None else -1):
+            raise PoolExhausted(f"no connection available within {self.timeout}s")
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+                self.leases += 1
+            if conn is not None and self.health_check and not self._is_healthy(conn):
+                with self._lock:
+                    self.health_failures += 1
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._new_connection()
+            else:
+                with self._lock:
+                    self.reuses += 1
+            return PooledConnection(self, conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: MySQLConnection, reuse: bool = True) -> None:
+        try:
+            # rollback() would drain an unread result set row by row (a borrower
+            # that stopped iterating early); disconnecting is cheaper
+            if not reuse or getattr(conn, "unread_result", False):
+                self._discard(conn)
+                return
+            # Ends any transaction the borrower left open.
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+        else:
+            with self._lock:
+                self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _discard(conn: MySQLConnection) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def lease(self) -> Iterator[PooledConnection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self) -> None:
+        """Disconnect every idle connection (leased ones are closed when returned)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "handshakes": self.handshakes,
+                "leases": self.leases,
+                "reuses": self.reuses,
+                "health_failures": self.health_failures,
+            }
+
+
+_default_pool: Optional[ConnectionPool] = None
+_default_lock = threading.Lock()
+
+
+def _forget_after_fork() -> None:
+    # A forked child must not talk over the parent's sockets; it opens its own.
+    global _default_pool, _default_lock
+    _default_pool = None
+    _default_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_after_fork)
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool, sized by MYSQL_POOL_SIZE (default 5)."""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = ConnectionPool(size=int(os.getenv("MYSQL_POOL_SIZE", 5)))
+        return _default_pool
+
+
+def reset_pool() -> None:
+    """Disconnect and forget the process-wide pool; the next `get_pool()` builds a new one."""
+    global _default_pool
+    with _default_lock:
+        pool, _default_pool = _default_pool, None
+    if pool is not None:
+        pool.close_all()
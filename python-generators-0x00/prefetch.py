@@ -0,0 +1,81 @@
+"""Read-ahead for page/batch generators.
+
+`lazy_paginate` only asks for page N+1 after the consumer is done with page
+N, so every page costs network round trip + processing time in sequence.
+`prefetch` runs the source generator on a background thread and keeps up to
+`depth` items waiting in a bounded queue, overlapping the two:
+
+    for page in prefetch(lazy_paginate(1000, mode="keyset"), depth=2):
+        process(page)
+
+Exceptions raised by the source are re-raised in the consumer. Leaving the
+loop early (break, exception, `close()`) stops the thread, which then closes
+the source generator on its own thread, releasing its connection.
+"""
+import queue
+import threading
+from typing import Generator, Iterable, TypeVar
+
+paginate = __import__('2-lazy_paginate')
+
+T = TypeVar("T")
+
+_END = object()
+_POLL = 0.1
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def _put(out: "queue.Queue", item, stop: threading.Event) -> bool:
+    """Block until `item` is queued or the consumer went away; False in the latter case."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=_POLL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(source: Iterable, out: "queue.Queue", stop: threading.Event) -> None:
+    it = iter(source)
+    try:
+        for item in it:
+            if not _put(out, item, stop):
+                return
+        _put(out, _END, stop)
+    except BaseException as exc:
+        _put(out, _Failure(exc), stop)
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
+
+
+def prefetch(source: Iterable[T], depth: int = 1) -> Generator[T, None, None]:
+    """Yield from `source` while a background thread fetches up to `depth` items ahead."""
+    if depth < 1:
+        raise ValueError("depth must be at least 1")
+    out: "queue.Queue" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    worker = threading.Thread(target=_produce, args=(source, out, stop), name="prefetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = out.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+
+
+def lazy_paginate_ahead(page_size: int, mode: str = "offset", depth: int = 1) -> Generator[list, None, None]:
+    """`lazy_paginate` with the next `depth` pages fetched while the current one is consumed."""
+    return prefetch(paginate.lazy_paginate(page_size, mode), depth)
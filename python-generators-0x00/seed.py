@@ -1,11 +1,16 @@
 import csv
+import itertools
+import mmap
 import uuid
 from contextlib import contextmanager
-from typing import Generator, Tuple
+from typing import Dict, Generator, Iterable, List, Optional, Tuple
 
 import mysql.connector
 from mysql.connector import errorcode, MySQLConnection
 
+from backends import connection_config, get_backend
+from pool import PooledConnection, get_pool
+
 # -------------------
 # Low‑level utilities
 # -------------------
@@ -29,15 +34,7 @@ def _cursor(conn: MySQLConnection):
 
 def connect_db() -> MySQLConnection:
     """Connects to the MySQL server using environment variables for creds (or defaults)."""
-    import os
-
-    cfg = {
-        "user": os.getenv("MYSQL_USER", "root"),
-        "password": os.getenv("MYSQL_PASSWORD", ""),
-        "host": os.getenv("MYSQL_HOST", "127.0.0.1"),
-        "port": int(os.getenv("MYSQL_PORT", 3306)),
-    }
-    return mysql.connector.connect(**cfg)
+    return mysql.connector.connect(**connection_config(database=None))
 
 
 def create_database(conn: MySQLConnection, db_name: str = "ALX_prodev") -> None:
@@ -46,20 +43,30 @@ def create_database(conn: MySQLConnection, db_name: str = "ALX_prodev") -> None:
         cur.execute(f"CREATE DATABASE IF NOT EXISTS {db_name} DEFAULT CHARACTER SET 'utf8mb4'")
 
 
-def connect_to_prodev() -> MySQLConnection:
-    """Return a connection object already using the ALX_prodev database (creating it if needed)."""
-    root_conn = connect_db()
-    create_database(root_conn)
-    root_conn.database = "ALX_prodev"
-    return root_conn
+_database_ready = False
+
+
+def connect_to_prodev() -> PooledConnection:
+    """Lease a pooled connection to ALX_prodev (creating the database on first use).
+
+    Closing the returned connection hands it back to the shared pool. With the
+    SQLite backend the database file is created by the first connection."""
+    global _database_ready
+    if not _database_ready and get_backend().name == "mysql":
+        root_conn = connect_db()
+        try:
+            create_database(root_conn)
+        finally:
+            root_conn.close()
+        _database_ready = True
+    return get_pool().acquire()
 
 # -------------------
 # Schema helpers
 # -------------------
 
-def create_table(conn: MySQLConnection) -> None:
-    """Create user_data table with required columns if it does not exist."""
-    ddl = (
+_USER_DATA_DDL = {
+    "mysql": (
         "CREATE TABLE IF NOT EXISTS user_data ("
         "  user_id CHAR(36) NOT NULL PRIMARY KEY,"
         "  name VARCHAR(255) NOT NULL,"
@@ -67,9 +74,23 @@ def create_table(conn: MySQLConnection) -> None:
         "  age DECIMAL(3,0) NOT NULL,"
         "  INDEX (user_id)"
         ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"
-    )
+    ),
+    # WITHOUT ROWID clusters rows on user_id like InnoDB, so keyset seeks stay cheap.
+    "sqlite": (
+        "CREATE TABLE IF NOT EXISTS user_data ("
+        "  user_id TEXT NOT NULL PRIMARY KEY,"
+        "  name TEXT NOT NULL,"
+        "  email TEXT NOT NULL UNIQUE,"
+        "  age INTEGER NOT NULL"
+        ") WITHOUT ROWID"
+    ),
+}
+
+
+def create_table(conn: MySQLConnection) -> None:
+    """Create user_data table with required columns if it does not exist."""
     with _cursor(conn) as cur:
-        cur.execute(ddl)
+        cur.execute(_USER_DATA_DDL[get_backend().name])
 
 # -------------------
 # Data helpers
@@ -98,6 +119,230 @@ def insert_data(conn: MySQLConnection, csv_path: str) -> None:
                 data,
             )
 
+
+def _csv_chunks(csv_path: str, chunk_size: int) -> Generator[List[Tuple[str, str, str, str]], None, None]:
+    """Stream the CSV as lists of at most `chunk_size` ready-to-insert tuples."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        chunk = []
+        for row in reader:
+            chunk.append((str(uuid.uuid4()), row["name"], row["email"], row["age"]))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _load_chunk(cur, chunk: List[Tuple[str, str, str, str]], upsert: bool) -> int:
+    """Ship one chunk through LOAD DATA LOCAL INFILE via a temporary CSV file."""
+    import os
+    import tempfile
+
+    if upsert:
+        raise ValueError("LOAD DATA cannot update existing rows; use executemany for upserts")
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as tmp:
+            csv.writer(tmp, lineterminator="\n").writerows(chunk)
+        cur.execute(
+            "LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE user_data "
+            "CHARACTER SET utf8mb4 FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+            "LINES TERMINATED BY '\\n' (user_id, name, email, age)",
+            (path,),
+        )
+        return cur.rowcount
+    finally:
+        os.remove(path)
+
+
+_INSERT_IGNORE = "INSERT IGNORE INTO user_data (user_id, name, email, age) VALUES (%s,%s,%s,%s)"
+_UPSERT = {
+    "mysql": (
+        "INSERT INTO user_data (user_id, name, email, age) VALUES (%s,%s,%s,%s) "
+        "ON DUPLICATE KEY UPDATE name = VALUES(name), age = VALUES(age)"
+    ),
+    "sqlite": (
+        "INSERT INTO user_data (user_id, name, email, age) VALUES (%s,%s,%s,%s) "
+        "ON CONFLICT(email) DO UPDATE SET name = excluded.name, age = excluded.age"
+    ),
+}
+
+
+def _write_chunks(
+    conn: MySQLConnection,
+    chunks: Iterable[List[Tuple]],
+    use_load_data: bool = False,
+    upsert: bool = False,
+) -> Dict[str, float]:
+    """Write each chunk in one statement and commit it; report rows/sec."""
+    import time
+
+    backend = get_backend().name
+    if use_load_data and backend != "mysql":
+        raise ValueError("LOAD DATA LOCAL INFILE is only available with the MySQL backend")
+    sql = _UPSERT[backend] if upsert else _INSERT_IGNORE
+    rows_read = rows_affected = 0
+    start = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        for chunk in chunks:
+            if use_load_data:
+                affected = _load_chunk(cur, chunk, upsert)
+            else:
+                cur.executemany(sql, chunk)
+                affected = cur.rowcount
+            conn.commit()
+            rows_read += len(chunk)
+            rows_affected += max(affected, 0)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "rows_read": rows_read,
+        "rows_affected": rows_affected,
+        "seconds": elapsed,
+        "rows_per_sec": rows_read / elapsed if elapsed else float("inf"),
+    }
+
+
+def bulk_insert_data(
+    conn: MySQLConnection,
+    csv_path: str,
+    chunk_size: int = 5000,
+    use_load_data: bool = False,
+    upsert: bool = False,
+) -> Dict[str, float]:
+    """Bulk-load the CSV in chunks of `chunk_size` rows, committing after each chunk.
+
+    Duplicates are resolved by the unique email index rather than a lookup per
+    row: `INSERT IGNORE` skips them, or with `upsert=True` they are refreshed
+    via `ON DUPLICATE KEY UPDATE`. Each chunk is written with a single
+    `executemany` (rewritten into one multi-row INSERT by the connector) or,
+    with `use_load_data=True`, `LOAD DATA LOCAL INFILE` – the connection must
+    then allow local infile (MYSQL_ALLOW_LOCAL_INFILE=1).
+
+    Returns rows read, rows affected, elapsed seconds and rows/sec.
+    """
+    return _write_chunks(conn, _csv_chunks(csv_path, chunk_size), use_load_data, upsert)
+
+
+def _csv_byte_ranges(mm: mmap.mmap, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Cut the body of a mapped CSV into ~`chunk_bytes` ranges that end on line boundaries.
+
+    Assumes no quoted field spans several lines, which holds for user_data.csv.
+    """
+    size = len(mm)
+    pos = mm.find(b"\n") + 1 or size  # skip the header line
+    ranges = []
+    while pos < size:
+        nl = mm.find(b"\n", min(pos + chunk_bytes, size - 1))
+        end = size if nl == -1 else nl + 1
+        ranges.append((pos, end))
+        pos = end
+    return ranges
+
+
+def _parse_csv_range(csv_path: str, start: int, end: int, fields: Tuple[int, int, int]) -> Tuple[List[Tuple], int]:
+    """Worker: parse and validate one byte range; returns insertable rows and the invalid count."""
+    import io
+
+    with open(csv_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode("utf-8")
+    name_i, email_i, age_i = fields
+    rows, invalid = [], 0
+    for rec in csv.reader(io.StringIO(text)):
+        if not rec:
+            continue
+        try:
+            name, email, age = rec[name_i].strip(), rec[email_i].strip(), int(float(rec[age_i]))
+        except (IndexError, ValueError):
+            invalid += 1
+            continue
+        if not name or "@" not in email or not 0 <= age <= 999:
+            invalid += 1
+            continue
+        rows.append((str(uuid.uuid4()), name, email, age))
+    return rows, invalid
+
+
+def parallel_insert_data(
+    conn: MySQLConnection,
+    csv_path: str,
+    workers: Optional[int] = None,
+    chunk_bytes: int = 4 << 20,
+    upsert: bool = False,
+) -> Dict[str, float]:
+    """Parse the CSV on `workers` processes and feed one writer on `conn`.
+
+    The file is memory-mapped and split into ~`chunk_bytes` ranges on line
+    boundaries; each worker parses, validates and assigns UUIDs to one range
+    at a time. Only `2 * workers` ranges are in flight, so memory stays
+    bounded however large the file is. Chunks are written in file order with
+    the same INSERT IGNORE/upsert statement as `bulk_insert_data`.
+
+    Returns the `bulk_insert_data` report plus `rows_invalid`.
+    """
+    import os
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    if os.path.getsize(csv_path) == 0:
+        return _write_chunks(conn, [], upsert=upsert) | {"rows_invalid": 0}
+    with open(csv_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header = next(csv.reader([mm[:mm.find(b"\n") + 1 or len(mm)].decode("utf-8")]))
+        ranges = _csv_byte_ranges(mm, chunk_bytes)
+    names = [h.strip() for h in header]
+    fields = (names.index("name"), names.index("email"), names.index("age"))
+    invalid = 0
+
+    def parsed() -> Generator[List[Tuple], None, None]:
+        nonlocal invalid
+        jobs = iter(ranges)
+        with ProcessPoolExecutor(workers) as pool:
+            window = deque(
+                pool.submit(_parse_csv_range, csv_path, start, end, fields)
+                for start, end in itertools.islice(jobs, 2 * workers)
+            )
+            while window:
+                rows, bad = window.popleft().result()
+                nxt = next(jobs, None)
+                if nxt is not None:
+                    window.append(pool.submit(_parse_csv_range, csv_path, *nxt, fields))
+                invalid += bad
+                if rows:
+                    yield rows
+
+    report = _write_chunks(conn, parsed(), upsert=upsert)
+    report["rows_invalid"] = invalid
+    return report
+
+
+def ensure_rows(conn: MySQLConnection, rows: int, chunk_size: int = 10_000) -> int:
+    """Top user_data up with synthetic users until it holds at least `rows` rows (for benchmarks)."""
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COUNT(*) FROM user_data")
+        have = cur.fetchone()[0]
+        while have < rows:
+            chunk = []
+            for i in range(have, min(have + chunk_size, rows)):
+                uid = str(uuid.uuid4())
+                chunk.append((uid, f"user {i}", f"{uid}@bench.local", 18 + i % 80))
+            cur.executemany(
+                "INSERT IGNORE INTO user_data (user_id, name, email, age) VALUES (%s,%s,%s,%s)",
+                chunk,
+            )
+            conn.commit()
+            have += len(chunk)
+    finally:
+        cur.close()
+    return have
+
 # -------------------
 # Streaming generator
 # -------------------
@@ -124,12 +369,31 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Seed ALX_prodev database and optionally stream data.")
     parser.add_argument("csv", help="Path to user_data.csv")
     parser.add_argument("--stream", action="store_true", help="Stream rows after seeding")
+    parser.add_argument("--bulk", action="store_true", help="Load the CSV in chunks with INSERT IGNORE")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per chunk/commit in --bulk mode")
+    parser.add_argument("--load-data", action="store_true",
+                        help="Use LOAD DATA LOCAL INFILE in --bulk mode (needs MYSQL_ALLOW_LOCAL_INFILE=1)")
+    parser.add_argument("--upsert", action="store_true", help="Update name/age of existing emails in --bulk mode")
+    parser.add_argument("--parallel", type=int, metavar="N",
+                        help="Parse the CSV on N worker processes feeding one bulk writer")
     args = parser.parse_args()
 
     try:
         connection = connect_to_prodev()
         create_table(connection)
-        insert_data(connection, args.csv)
+        report = None
+        if args.parallel:
+            report = parallel_insert_data(connection, args.csv, args.parallel, upsert=args.upsert)
+            print(f"Skipped {report['rows_invalid']} invalid rows")
+        elif args.bulk:
+            report = bulk_insert_data(connection, args.csv, args.chunk_size, args.load_data, args.upsert)
+        else:
+            insert_data(connection, args.csv)
+        if report:
+            print(
+                f"Loaded {report['rows_read']} rows ({report['rows_affected']} affected) "
+                f"in {report['seconds']:.2f}s – {report['rows_per_sec']:,.0f} rows/sec"
+            )
         print("Database seeded successfully.")
         if args.stream:
             for rec in stream_users(connection):
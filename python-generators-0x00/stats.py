@@ -0,0 +1,182 @@
+"""Streaming statistics over user_data ages.
+
+Two ways to summarise a column without materialising it:
+
+* `aggregate_ages` pushes COUNT/AVG/MIN/MAX down to MySQL – one row comes
+  back no matter how big the table is.
+* `StreamStats` is a one-pass estimator for filters the database cannot
+  evaluate: exact mean, Welford variance, reservoir-sampled percentiles and a
+  fixed-width histogram. `track` feeds it while passing values through, so
+  the running figures can be read at any point during the stream.
+
+    stats = StreamStats()
+    for age in track(stream_user_ages(), stats):
+        if stats.count % 100_000 == 0:
+            print(stats.snapshot())
+"""
+import math
+import random
+from typing import Dict, Generator, Iterable, List, Optional
+
+from filters import Predicate, compile_where
+from pool import get_pool
+
+
+class RunningStats:
+    """Count, mean, variance, min and max in one pass.
+
+    The mean is `total / count`, so it matches AVG() in the database exactly;
+    Welford's running mean is kept only to compute the variance stably.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        value = float(value)
+        self.count += 1
+        self.total += value
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        """Mean of the values seen (0.0 before the first)."""
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0.0 until two values have been seen)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class Reservoir:
+    """Uniform sample of at most `size` values from a stream (Algorithm R)."""
+
+    def __init__(self, size: int = 10_000, rng: Optional[random.Random] = None):
+        if size < 1:
+            raise ValueError("reservoir size must be at least 1")
+        self.size = size
+        self.seen = 0
+        self.sample: List[float] = []
+        self._rng = rng or random.Random()
+
+    def add(self, value: float) -> None:
+        self.seen += 1
+        if len(self.sample) < self.size:
+            self.sample.append(value)
+            return
+        slot = self._rng.randrange(self.seen)
+        if slot < self.size:
+            self.sample[slot] = value
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Estimate the `pct` percentile (0-100) by linear interpolation over the sample."""
+        if not 0 <= pct <= 100:
+            raise ValueError("percentile must be within 0..100")
+        if not self.sample:
+            return None
+        ordered = sorted(self.sample)
+        pos = (len(ordered) - 1) * pct / 100
+        lo, hi = math.floor(pos), math.ceil(pos)
+        return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+class Histogram:
+    """Counts per fixed-width bucket; bucket `k` covers [k * width, (k + 1) * width)."""
+
+    def __init__(self, width: float = 10):
+        if width <= 0:
+            raise ValueError("bucket width must be positive")
+        self.width = width
+        self.counts: Dict[float, int] = {}
+
+    def add(self, value: float) -> None:
+        bucket = math.floor(value / self.width) * self.width
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+
+    def buckets(self) -> List[tuple]:
+        """Sorted `(lower_bound, count)` pairs."""
+        return sorted(self.counts.items())
+
+
+class StreamStats:
+    """Running moments, percentiles and histogram fed from a single pass."""
+
+    def __init__(self, reservoir_size: int = 10_000, bucket_width: float = 10,
+                 percentiles: Iterable[float] = (50, 90, 99)):
+        self.moments = RunningStats()
+        self.reservoir = Reservoir(reservoir_size)
+        self.histogram = Histogram(bucket_width)
+        self.percentiles = tuple(percentiles)
+
+    @property
+    def count(self) -> int:
+        return self.moments.count
+
+    def add(self, value: float) -> None:
+        value = float(value)
+        self.moments.add(value)
+        self.reservoir.add(value)
+        self.histogram.add(value)
+
+    def snapshot(self) -> Dict:
+        """Current figures; safe to call at any point while the stream is running."""
+        m = self.moments
+        return {
+            "count": m.count,
+            "mean": m.mean if m.count else None,
+            "stddev": m.stddev,
+            "min": m.min,
+            "max": m.max,
+            "percentiles": {p: self.reservoir.percentile(p) for p in self.percentiles},
+            "histogram": self.histogram.buckets(),
+        }
+
+
+def track(values: Iterable[float], stats: StreamStats) -> Generator[float, None, None]:
+    """Pass `values` through unchanged while feeding them into `stats`."""
+    for value in values:
+        stats.add(value)
+        yield value
+
+
+def summarise(values: Iterable[float], **kwargs) -> Dict:
+    """Consume `values` in one pass and return the final `StreamStats.snapshot()`."""
+    stats = StreamStats(**kwargs)
+    for _ in track(values, stats):
+        pass
+    return stats.snapshot()
+
+
+def aggregate_ages(filters: Iterable[Predicate] = ()) -> Dict:
+    """COUNT/AVG/MIN/MAX of age computed by the database for the pushed-down `filters`."""
+    where, params, residual = compile_where(filters)
+    if residual:
+        raise ValueError("aggregate_ages only accepts filters that can be pushed down; "
+                         "use summarise() for Python-side predicates")
+    with get_pool().lease() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT COUNT(age), AVG(age), MIN(age), MAX(age) FROM user_data{where}", params)
+        count, avg, low, high = cur.fetchone()
+        cur.close()
+    return {
+        "count": count,
+        "mean": float(avg) if avg is not None else None,
+        "min": float(low) if low is not None else None,
+        "max": float(high) if high is not None else None,
+    }
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the user_data change feed (follow.py) on the SQLite backend:
+- resuming from a checkpoint in changelog and column mode
+- user_data keeping its shape when change tracking is enabled
+"""
+
+import os
+import tempfile
+import time
+import unittest
+import uuid
+
+import follow
+import seed
+from backends import SQLiteBackend, use_backend
+from checkpoint import FileCheckpoint, SQLiteCheckpoint
+from pool import get_pool, reset_pool
+
+START = {"changelog": 0, "column": ("", "")}
+
+
+class FollowTestCase(unittest.TestCase):
+    """Gives each test an empty user_data table in a temporary SQLite file."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        use_backend(SQLiteBackend(os.path.join(tmp.name, "prodev.sqlite3")))
+        self.addCleanup(reset_pool)
+        with get_pool().lease() as conn:
+            seed.create_table(conn)
+            conn.commit()
+
+    def track(self, mode):
+        with get_pool().lease() as conn:
+            follow.enable_change_tracking(conn, mode)
+
+    def insert_users(self, count):
+        """Insert `count` users; returns their ids in insertion order."""
+        ids = [str(uuid.uuid4()) for _ in range(count)]
+        with get_pool().lease() as conn:
+            cur = conn.cursor()
+            cur.executemany(
+                "INSERT INTO user_data (user_id, name, email, age) VALUES (%s, %s, %s, %s)",
+                [(uid, "user", f"{uid}@example.com", 30) for uid in ids],
+            )
+            conn.commit()
+            cur.close()
+        time.sleep(0.01)  # column mode stamps rows with millisecond resolution
+        return ids
+
+    def drain(self, mode, **kwargs):
+        """User ids the feed yields until it goes idle."""
+        return [row[0] for _, row in follow.follow(mode, idle_timeout=0, poll_interval=0.01, **kwargs)]
+
+
+class TestFollowResume(FollowTestCase):
+    """Test cases for resuming a feed from each checkpoint store."""
+
+    def checkpoints(self, mode):
+        store = SQLiteCheckpoint(os.path.join(self.tmp, "jobs.db"), mode)
+        self.addCleanup(store.close)
+        return [FileCheckpoint(os.path.join(self.tmp, f"{mode}.ckpt")), store]
+
+    def check_resume(self, mode):
+        self.track(mode)
+        first = self.insert_users(3)
+        for checkpoint in self.checkpoints(mode):
+            with self.subTest(checkpoint=type(checkpoint).__name__):
+                self.assertCountEqual(self.drain(mode, since=START[mode], checkpoint=checkpoint), first)
+                self.assertEqual(self.drain(mode, checkpoint=checkpoint), [])
+        second = self.insert_users(2)
+        for checkpoint in self.checkpoints(mode):
+            with self.subTest(checkpoint=type(checkpoint).__name__):
+                self.assertCountEqual(self.drain(mode, checkpoint=checkpoint), second)
+
+    def test_resume_changelog(self):
+        """A changelog feed restarted from its checkpoint yields only later changes."""
+        self.check_resume("changelog")
+
+    def test_resume_column(self):
+        """A column feed restarted from its checkpoint yields only later changes."""
+        self.check_resume("column")
+
+    def test_column_feed_sees_updates(self):
+        """An updated row is delivered again in column mode."""
+        self.track("column")
+        ids = self.insert_users(2)
+        checkpoint = FileCheckpoint(os.path.join(self.tmp, "column.ckpt"))
+        self.drain("column", since=START["column"], checkpoint=checkpoint)
+        with get_pool().lease() as conn:
+            cur = conn.cursor()
+            cur.execute("UPDATE user_data SET age = 31 WHERE user_id = %s", (ids[0],))
+            conn.commit()
+            cur.close()
+        self.assertEqual(self.drain("column", checkpoint=checkpoint), [ids[0]])
+
+    def test_watermark_round_trip(self):
+        """Saved watermarks come back with the type of their mode."""
+        for mode, watermark in (("changelog", 4), ("column", ("2024-01-01 00:00:00.000", "u1"))):
+            with self.subTest(mode=mode):
+                self.assertEqual(follow._load_watermark(mode, follow._dump_watermark(watermark)), watermark)
+
+
+class TestUserDataShape(FollowTestCase):
+    """Change tracking must not change what user_data rows look like."""
+
+    def test_column_mode_keeps_user_data_columns(self):
+        """Positional INSERTs and SELECT * rows still have four columns."""
+        self.track("column")
+        with get_pool().lease() as conn:
+            cur = conn.cursor()
+            cur.execute("INSERT INTO user_data VALUES (%s, %s, %s, %s)", ("u1", "ada", "ada@example.com", 36))
+            conn.commit()
+            cur.execute("SELECT * FROM user_data")
+            rows = cur.fetchall()
+            cur.close()
+        self.assertEqual(rows, [("u1", "ada", "ada@example.com", 36)])
+        self.assertEqual(self.drain("column", since=START["column"]), ["u1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
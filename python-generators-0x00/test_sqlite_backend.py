@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the generators run against the SQLite backend:
+- SQL translation and connection settings
+- keyset vs LIMIT/OFFSET pagination
+- filter push-down and aggregates
+- partitioned scans
+- checkpointed, resumable scans
+
+The change feed has its own tests in test_follow.py.
+"""
+
+import os
+import tempfile
+import unittest
+
+import seed
+import stats
+from backends import SQLiteBackend, translate, use_backend
+from checkpoint import FileCheckpoint, resumable_pages, resumable_stream
+from filters import age_between, email_domain, matches
+from partitioned import scan_partitioned
+from pool import get_pool, reset_pool
+
+batches = __import__('1-batch_processing')
+paginate = __import__('2-lazy_paginate')
+
+ROWS = 57
+
+
+class SQLiteTestCase(unittest.TestCase):
+    """Gives each test a user_data table of ROWS synthetic users in a temporary SQLite file."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.backend = use_backend(SQLiteBackend(os.path.join(tmp.name, "prodev.sqlite3")))
+        self.addCleanup(reset_pool)
+        with get_pool().lease() as conn:
+            seed.create_table(conn)
+            seed.ensure_rows(conn, ROWS)
+            cur = conn.cursor()
+            cur.execute("SELECT user_id, name, email, age FROM user_data ORDER BY user_id")
+            self.rows = cur.fetchall()
+            cur.close()
+
+
+class TestBackend(SQLiteTestCase):
+    """Test cases for the SQLite backend itself."""
+
+    def test_translate(self):
+        """MySQL placeholders and INSERT IGNORE are rewritten for SQLite."""
+        self.assertEqual(
+            translate("INSERT IGNORE INTO user_data (user_id) VALUES (%s)"),
+            "INSERT OR IGNORE INTO user_data (user_id) VALUES (?)",
+        )
+
+    def test_connection_settings(self):
+        """Connections run in WAL mode with memory-mapped reads."""
+        with get_pool().lease() as conn:
+            cur = conn.cursor()
+            cur.execute("PRAGMA journal_mode")
+            self.assertEqual(cur.fetchone()[0], "wal")
+            cur.execute("PRAGMA mmap_size")
+            self.assertEqual(cur.fetchone()[0], self.backend.mmap_size)
+            cur.close()
+
+    def test_seeded_rows(self):
+        """ensure_rows tops the table up without duplicating rows."""
+        with get_pool().lease() as conn:
+            self.assertEqual(seed.ensure_rows(conn, ROWS), ROWS)
+        self.assertEqual(len(self.rows), ROWS)
+
+
+class TestPagination(SQLiteTestCase):
+    """Test cases for lazy_paginate's two modes."""
+
+    def test_keyset_matches_offset(self):
+        """Both modes return every row once, in pages of the same sizes."""
+        for page_size in (1, 10, ROWS, ROWS + 5):
+            with self.subTest(page_size=page_size):
+                offset = list(paginate.lazy_paginate(page_size, mode="offset"))
+                keyset = list(paginate.lazy_paginate(page_size, mode="keyset"))
+                self.assertEqual([len(p) for p in keyset], [len(p) for p in offset])
+                self.assertEqual(sorted(r for p in offset for r in p), self.rows)
+                self.assertEqual([r for p in keyset for r in p], self.rows)
+
+    def test_keyset_page_after_last_key(self):
+        """A keyset page starts right after the given user_id."""
+        page = paginate.paginate_users_after(5, self.rows[9][0])
+        self.assertEqual(page, self.rows[10:15])
+        self.assertEqual(paginate.paginate_users_after(5, self.rows[-1][0]), [])
+
+
+class TestPushdown(SQLiteTestCase):
+    """Test cases for filters compiled into the query."""
+
+    def test_pushed_down_filters(self):
+        """Pushed-down filters select the same rows as filtering in Python."""
+        filters = (age_between(30, 45), email_domain("bench.local"))
+        got = [r for b in batches.stream_users_in_batches(7, filters=filters) for r in b]
+        expected = [r for r in self.rows if 30 <= r[3] <= 45 and r[2].endswith("@bench.local")]
+        self.assertTrue(expected)
+        self.assertCountEqual(got, expected)
+
+    def test_residual_filter_and_projection(self):
+        """A Python-only predicate may use a column that is not projected."""
+        filters = (age_between(20, 60), matches("user_id", lambda uid: uid[0] in "0123456789"))
+        got = [r for b in batches.stream_users_in_batches(7, columns=("name",), filters=filters) for r in b]
+        expected = [(r[1],) for r in self.rows if 20 <= r[3] <= 60 and r[0][0].isdigit()]
+        self.assertCountEqual(got, expected)
+
+    def test_domain_filter_escapes_wildcards(self):
+        """LIKE wildcards in a domain are matched literally."""
+        got = [r for b in batches.stream_users_in_batches(10, filters=(email_domain("bench_local"),)) for r in b]
+        self.assertEqual(got, [])
+
+    def test_aggregate_matches_stream(self):
+        """The database's COUNT/AVG/MIN/MAX agree with a one-pass scan."""
+        pushed = stats.aggregate_ages((age_between(25, 70),))
+        ages = [r[3] for r in self.rows if 25 <= r[3] <= 70]
+        self.assertEqual(pushed["count"], len(ages))
+        self.assertAlmostEqual(pushed["mean"], sum(ages) / len(ages))
+        self.assertEqual((pushed["min"], pushed["max"]), (min(ages), max(ages)))
+
+
+class TestPartitioned(SQLiteTestCase):
+    """Test cases for the range-partitioned scan."""
+
+    def test_every_row_once(self):
+        """The partitions together cover the table exactly once."""
+        self.assertCountEqual(list(scan_partitioned(workers=3, batch_size=7)), self.rows)
+
+    def test_ordered(self):
+        """ordered=True yields the table in user_id order."""
+        self.assertEqual(list(scan_partitioned(workers=3, batch_size=7, ordered=True)), self.rows)
+
+
+class TestResumable(SQLiteTestCase):
+    """Test cases for checkpointed scans."""
+
+    def test_resume_after_stop(self):
+        """A restarted scan picks up after the last row the consumer finished."""
+        checkpoint = FileCheckpoint(os.path.join(self.tmp, "scan.ckpt"))
+        scan = resumable_stream(checkpoint, page_size=10, every=5)
+        first = [next(scan) for _ in range(25)]
+        scan.close()  # the 25th row was handed out but never finished
+        self.assertEqual(checkpoint.load(), self.rows[23][0])
+        rest = list(resumable_stream(checkpoint, page_size=10, every=5))
+        self.assertEqual(first[:24] + rest, self.rows)
+
+    def test_pages_resume(self):
+        """Page-at-a-time scans resume on a page boundary."""
+        checkpoint = FileCheckpoint(os.path.join(self.tmp, "pages.ckpt"))
+        scan = resumable_pages(checkpoint, page_size=10, every=1)
+        first = [next(scan), next(scan)]
+        scan.close()
+        rest = [r for page in resumable_pages(checkpoint, page_size=10) for r in page]
+        self.assertEqual(first[0] + rest, self.rows)
+
+
+if __name__ == "__main__":
+    unittest.main()